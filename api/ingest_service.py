@@ -0,0 +1,261 @@
+import argparse
+import atexit
+import hashlib
+import os
+import secrets
+import threading
+import time
+
+import pandas as pd
+from flask import Flask, jsonify, request
+from flask_login import UserMixin, current_user, login_required
+
+from auth.auth_handler import login_manager
+from models.database import IngestDevice, get_session, remove_session
+from utils.cache import QueryCache
+from utils.ingest import IngestReport, after_ingest, insert_rows, validate_chunk
+
+MAX_READINGS_PER_REQUEST = int(os.getenv('INGEST_MAX_READINGS_PER_REQUEST', '5000'))
+
+class Device(UserMixin):
+    """Authenticated device principal for flask-login."""
+
+    def __init__(self, device_id, name, department):
+        self.id = device_id
+        self.name = name
+        self.department = department
+
+    def get_id(self):
+        return f"device:{self.id}"
+
+def hash_device_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def create_device(name, department):
+    """Register a device and return its bearer token (only the hash is stored)."""
+    token = secrets.token_urlsafe(32)
+    session = get_session()
+    session.add(IngestDevice(name=name, department=department, token_hash=hash_device_token(token)))
+    session.commit()
+    return token
+
+# Token lookups are cached briefly so a busy device costs one query per minute, not per request
+_device_cache = QueryCache(max_entries=1024, ttl_seconds=60)
+
+@login_manager.request_loader
+def load_device_from_request(req):
+    header = req.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return None
+    token_hash = hash_device_token(header[len('Bearer '):].strip())
+
+    def lookup():
+        session = get_session()
+        device = session.query(IngestDevice).filter_by(token_hash=token_hash, active=True).first()
+        return Device(device.id, device.name, device.department) if device else None
+
+    return _device_cache.get_or_compute(token_hash, lookup)
+
+class WriteBuffer:
+    """Collects validated readings in memory and writes them in bulk.
+
+    A background thread flushes when max_rows readings are pending or the oldest
+    pending reading is max_delay seconds old. Readings still buffered when the
+    process dies are lost, which is the trade-off behind answering 202.
+
+    A flush is one transaction; if it fails, each request's readings are retried on
+    their own and then reading by reading, so one bad reading costs only itself.
+    Readings that still cannot be written are counted in lost_rows.
+    """
+
+    def __init__(self, max_rows=5000, max_delay=1.0):
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self._pending = []
+        self._pending_rows = 0
+        self._oldest = None
+        self._condition = threading.Condition()
+        self._stopped = False
+        self.flushed_rows = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.lost_rows = 0
+        self.last_flush_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name='ingest-write-buffer', daemon=True)
+        self._thread.start()
+
+    def add(self, rows):
+        with self._condition:
+            self._pending.append(rows)
+            self._pending_rows += len(rows)
+            if self._oldest is None:
+                # First reading of a batch starts the flush timer
+                self._oldest = time.monotonic()
+                self._condition.notify()
+            elif self._pending_rows >= self.max_rows:
+                self._condition.notify()
+
+    def _take(self):
+        batch, self._pending, self._pending_rows, self._oldest = self._pending, [], 0, None
+        return batch
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if self._pending_rows >= self.max_rows:
+                        break
+                    if self._oldest is not None:
+                        remaining = self.max_delay - (time.monotonic() - self._oldest)
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+                if self._stopped and not self._pending:
+                    return
+                batch = self._take()
+            self._write(batch)
+
+    def _write(self, batch):
+        if not batch:
+            return
+        started = time.perf_counter()
+        # Rows were validated when they were accepted; only the insert is retried, so a
+        # failure after the commit can never write a reading twice
+        report = IngestReport()
+        rows = pd.concat(batch, ignore_index=True)
+        try:
+            insert_rows(rows)
+            report.add_written(rows)
+        except Exception as e:
+            self.failed_flushes += 1
+            print(f"⚠️ Failed to write {len(rows)} buffered readings, retrying per request: {e}")
+            for rows in batch:
+                self._retry(rows, report)
+        self.flushed_rows += report.rows_written
+        self.flushes += 1
+
+        try:
+            after_ingest(report)
+        except Exception as e:
+            print(f"⚠️ {report.rows_written} readings written, but refreshing caches and forecasts failed: {e}")
+        self.last_flush_seconds = time.perf_counter() - started
+
+    def _retry(self, rows, report):
+        """Insert one request's readings alone, falling back to one reading at a time."""
+        try:
+            insert_rows(rows)
+            report.add_written(rows)
+            return
+        except Exception:
+            pass
+
+        for position in range(len(rows)):
+            row = rows.iloc[position:position + 1]
+            try:
+                insert_rows(row)
+            except Exception as e:
+                self.lost_rows += 1
+                print(f"❌ Dropped reading {row.iloc[0].to_dict()}: {e}")
+                continue
+            report.add_written(row)
+
+    def flush(self):
+        """Write everything pending now, on the calling thread."""
+        with self._condition:
+            batch = self._take()
+        self._write(batch)
+
+    def close(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self._thread.join()
+
+    def stats(self):
+        with self._condition:
+            pending = self._pending_rows
+        return {
+            'pending_rows': pending,
+            'flushed_rows': self.flushed_rows,
+            'flushes': self.flushes,
+            'failed_flushes': self.failed_flushes,
+            'lost_rows': self.lost_rows,
+            'last_flush_seconds': round(self.last_flush_seconds, 4)
+        }
+
+def create_app(buffer=None):
+    """Build the ingestion Flask app around a write buffer."""
+    app = Flask(__name__)
+    app.config['SECRET_KEY'] = os.getenv('INGEST_SECRET_KEY', secrets.token_hex(16))
+    login_manager.init_app(app)
+
+    buffer = buffer or WriteBuffer(
+        max_rows=int(os.getenv('INGEST_FLUSH_ROWS', '5000')),
+        max_delay=float(os.getenv('INGEST_FLUSH_SECONDS', '1.0'))
+    )
+    app.extensions['write_buffer'] = buffer
+
+    @app.teardown_appcontext
+    def release_session(exc):
+        remove_session()
+
+    @app.post('/api/v1/readings')
+    @login_required
+    def post_readings():
+        """Accept {"readings": [{waste_type, amount, timestamp?}, ...]} or a bare list.
+
+        Readings are recorded against the authenticated device's department and no
+        user; department or user_id fields sent by the device are ignored.
+        """
+        payload = request.get_json(silent=True)
+        readings = payload.get('readings') if isinstance(payload, dict) else payload
+        if not isinstance(readings, list) or not readings:
+            return jsonify(error="Expected a non-empty list of readings"), 400
+        if len(readings) > MAX_READINGS_PER_REQUEST:
+            return jsonify(error=f"At most {MAX_READINGS_PER_REQUEST} readings per request"), 413
+        if not all(isinstance(reading, dict) for reading in readings):
+            return jsonify(error="Each reading must be an object"), 400
+
+        chunk = pd.DataFrame.from_records(readings).drop(columns=['user_id'], errors='ignore')
+        chunk['department'] = current_user.department
+
+        rows, errors = validate_chunk(chunk)
+        if rows.empty:
+            return jsonify(error="No valid readings", details=errors), 400
+
+        buffer.add(rows)
+        return jsonify(accepted=len(rows), rejected=len(chunk) - len(rows), errors=errors), 202
+
+    @app.get('/api/v1/health')
+    def health():
+        return jsonify(status='ok', buffer=buffer.stats())
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Waste readings ingestion API for scales and sensors.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve = commands.add_parser('serve', help="Run the ingestion API")
+    serve.add_argument('--host', default='0.0.0.0')
+    serve.add_argument('--port', type=int, default=8050)
+
+    register = commands.add_parser('create-device', help="Register a device and print its token")
+    register.add_argument('name')
+    register.add_argument('department')
+
+    args = parser.parse_args()
+
+    if args.command == 'create-device':
+        token = create_device(args.name, args.department)
+        print(f"✅ Device '{args.name}' registered for {args.department}")
+        print(f"Token (shown once): {token}")
+    else:
+        app = create_app()
+        atexit.register(app.extensions['write_buffer'].close)
+        app.run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == "__main__":
+    main()
@@ -52,12 +52,14 @@ DEPARTMENTS = [
     "Sales",
     "Human Resources"
 ]
-import bcrypt
 import pyotp
 import qrcode
 import io
 import base64
 from datetime import datetime, timedelta
+from auth.password_service import get_password_service
+from auth.rate_limiter import get_login_limiter
+from auth.user_cache import invalidate_user
 from models.database import User, JobTitle, TwoFactorAuth, get_session
 
 # Departments list
@@ -72,20 +74,11 @@ DEPARTMENTS = [
 
 def hash_password(password):
     """Hash a password for storage"""
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
+    return get_password_service().hash(password)
 
 def check_password(stored_password, provided_password):
     """Verify a stored password against one provided by user"""
-    try:
-        return bcrypt.checkpw(
-            provided_password.encode('utf-8'), 
-            stored_password.encode('utf-8')
-        )
-    except ValueError:
-        # For compatibility with passwords that might have been hashed differently
-        return False
+    return get_password_service().verify(stored_password, provided_password)
 
 def create_user(username, email, password, department, job_title, two_factor_enabled=False):
     """Create a new user in the database"""
@@ -102,9 +95,6 @@ def create_user(username, email, password, department, job_title, two_factor_ena
     # Convert boolean to integer for PostgreSQL compatibility
     two_factor_enabled_int = 1 if two_factor_enabled else 0
 
-    # Hash the password
-    hashed_password = generate_password_hash(password)
-    
     # Create new user
     new_user = User(
         username=username,
@@ -125,16 +115,28 @@ def create_user(username, email, password, department, job_title, two_factor_ena
     
     return new_user
 
-def authenticate_user(username, password, two_factor_code=None):
-    """Authenticate a user by username and password"""
+def authenticate_user(username, password, two_factor_code=None, client=None):
+    """Authenticate a user by username and password.
+
+    Raises LoginThrottled, before any lookup or hashing, when the username or the
+    client (an address or session id) has made too many attempts.
+    """
+    get_login_limiter().check(username, client)
+
     session = get_session()
     user = session.query(User).filter_by(username=username).first()
     
     if not user:
         return None
     
-    if not check_password(user.password, password):
+    matches, new_hash = get_password_service().verify_and_update(user.password, password)
+    if not matches:
         return None
+
+    # Store a hash at the current cost (or bcrypt for old pbkdf2 accounts) now that the password is known
+    if new_hash is not None:
+        user.password = new_hash
+        session.commit()
     
     # Check 2FA if enabled
     if user.two_factor_enabled:
@@ -194,6 +196,7 @@ def verify_2fa_setup(user_id, verification_code):
         user = session.query(User).get(user_id)
         user.two_factor_enabled = True
         session.commit()
+        invalidate_user(user_id)
         return True, "2FA successfully enabled"
     
     return False, "Invalid verification code"
@@ -212,6 +215,7 @@ def disable_2fa(user_id):
     
     user.two_factor_enabled = False
     session.commit()
+    invalidate_user(user_id)
     
     return True, "2FA successfully disabled"
 
@@ -240,8 +244,24 @@ def update_user(user_id, email=None, department=None, job_title=None):
             session.add(new_job_title)
     
     session.commit()
+    invalidate_user(user_id)
     return True, "User information updated successfully"
 
+def change_password(user_id, current_password, new_password):
+    """Change a user's password after checking their current one"""
+    session = get_session()
+    user = session.query(User).get(user_id)
+
+    if not user:
+        return False, "User not found"
+
+    if not check_password(user.password, current_password):
+        return False, "Current password is incorrect"
+
+    user.password = hash_password(new_password)
+    session.commit()
+    return True, "Password changed successfully"
+
 def delete_user(username):
     """Delete a user from the database"""
     session = get_session()
@@ -258,6 +278,7 @@ def delete_user(username):
     # Delete the user
     session.delete(user)
     session.commit()
+    invalidate_user(user.id)
     
     return True
 
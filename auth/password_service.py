@@ -0,0 +1,128 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from werkzeug.security import check_password_hash
+
+# bcrypt work factor for new hashes; each step doubles the cost of a hash and of a login
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+# Hashes computed at once; bcrypt releases the GIL, so more than the core count only adds latency
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Hashes allowed to wait for a worker before new ones are turned away
+PASSWORD_HASH_QUEUE = int(os.getenv('PASSWORD_HASH_QUEUE', '64'))
+
+class PasswordServiceBusy(RuntimeError):
+    """Raised when too many hashes are already waiting for a worker."""
+
+class PasswordService:
+    """Hashes and verifies passwords on a bounded pool of worker threads.
+
+    bcrypt releases the GIL while it works, so hashing on a pool lets concurrent
+    logins use every core instead of queueing behind one script thread, while the
+    worker count caps how much CPU a burst of logins can take from the dashboard.
+    New hashes use bcrypt at `rounds`; stored hashes at another cost, or from the
+    werkzeug pbkdf2/scrypt hashes of older accounts, are reported by verify_and_update
+    so the caller can store a fresh hash once the password is known to be right.
+    """
+
+    def __init__(self, rounds=BCRYPT_ROUNDS, max_workers=PASSWORD_HASH_WORKERS, max_queued=PASSWORD_HASH_QUEUE):
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(max_workers + max_queued)
+        self.hashes = 0
+        self.verifications = 0
+        self.rehashes = 0
+        self.rejected = 0
+
+    def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PasswordServiceBusy("Too many sign-ins in progress, please try again in a moment")
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        """bcrypt hash of a password at the configured cost."""
+        self.hashes += 1
+        return self._run(_bcrypt_hash, password, self.rounds)
+
+    def verify(self, stored_password, provided_password):
+        """Whether the password matches a stored bcrypt or legacy werkzeug hash."""
+        self.verifications += 1
+        return self._run(_verify, stored_password, provided_password)
+
+    def needs_rehash(self, stored_password):
+        """Whether a stored hash was made with other parameters than new hashes would use."""
+        return bcrypt_rounds(stored_password) != self.rounds
+
+    def verify_and_update(self, stored_password, provided_password):
+        """Verify a password and, when it matches an outdated hash, hash it again.
+
+        Returns (matches, new hash or None); both steps run on one worker.
+        """
+        self.verifications += 1
+        matches, new_hash = self._run(self._verify_and_rehash, stored_password, provided_password)
+        if new_hash is not None:
+            self.rehashes += 1
+        return matches, new_hash
+
+    def _verify_and_rehash(self, stored_password, provided_password):
+        if not _verify(stored_password, provided_password):
+            return False, None
+        if self.needs_rehash(stored_password):
+            return True, _bcrypt_hash(provided_password, self.rounds)
+        return True, None
+
+    def stats(self):
+        return {
+            'rounds': self.rounds,
+            'workers': self.max_workers,
+            'hashes': self.hashes,
+            'verifications': self.verifications,
+            'rehashes': self.rehashes,
+            'rejected': self.rejected
+        }
+
+def bcrypt_rounds(stored_password):
+    """Cost factor of a bcrypt hash ($2b$12$...), or None for other hash formats."""
+    parts = (stored_password or '').split('$')
+    if len(parts) >= 4 and parts[1] in ('2a', '2b', '2y') and parts[2].isdigit():
+        return int(parts[2])
+    return None
+
+def _bcrypt_hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def _verify(stored_password, provided_password):
+    if not stored_password:
+        return False
+    if bcrypt_rounds(stored_password) is None:
+        # Accounts created before bcrypt carry werkzeug "pbkdf2:..." or "scrypt:..." hashes
+        try:
+            return check_password_hash(stored_password, provided_password)
+        except (ValueError, AttributeError):
+            return False
+    try:
+        return bcrypt.checkpw(provided_password.encode('utf-8'), stored_password.encode('utf-8'))
+    except ValueError:
+        # Malformed hash, or a password over bcrypt's 72 byte limit
+        return False
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_password_service():
+    """The process-wide password service, created on first use."""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = PasswordService()
+    return _service
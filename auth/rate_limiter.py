@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Sign-in attempts allowed in a burst, and refilled per minute, for one username and for one client
+LOGIN_USER_BURST = int(os.getenv('LOGIN_USER_BURST', '5'))
+LOGIN_USER_PER_MINUTE = float(os.getenv('LOGIN_USER_PER_MINUTE', '2'))
+LOGIN_CLIENT_BURST = int(os.getenv('LOGIN_CLIENT_BURST', '20'))
+LOGIN_CLIENT_PER_MINUTE = float(os.getenv('LOGIN_CLIENT_PER_MINUTE', '10'))
+# Usernames and clients tracked at once; the least recently seen are forgotten first
+LOGIN_LIMITER_MAX_KEYS = int(os.getenv('LOGIN_LIMITER_MAX_KEYS', '10000'))
+
+class LoginThrottled(RuntimeError):
+    """Raised for a sign-in attempt over its username's or client's limit."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class TokenBuckets:
+    """Thread-safe token buckets keyed by an arbitrary hashable, at most max_keys of them.
+
+    Each key may spend `burst` tokens at once and regains `per_second` tokens a second.
+    Buckets live in an LRU so memory stays bounded however many keys are seen; forgetting
+    a key only ever gives it a fresh, full bucket.
+    """
+
+    def __init__(self, burst, per_second, max_keys=LOGIN_LIMITER_MAX_KEYS):
+        self.burst = burst
+        self.per_second = per_second
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def take(self, key, now=None):
+        """Spend one token for key; returns 0 if allowed, else the seconds until a token is available."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.per_second)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.per_second if self.per_second > 0 else float('inf')
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evictions += 1
+            return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+class LoginRateLimiter:
+    """Per-username and per-client limits on sign-in attempts.
+
+    check() runs before the user lookup and the password hash, so attempts over the
+    limit cost a dictionary update rather than a bcrypt verification. An attempt
+    spends a token from both its username's bucket (guessing one account) and its
+    client's bucket (spraying many accounts from one browser or kiosk).
+    """
+
+    def __init__(self, user_burst=LOGIN_USER_BURST, user_per_minute=LOGIN_USER_PER_MINUTE,
+                 client_burst=LOGIN_CLIENT_BURST, client_per_minute=LOGIN_CLIENT_PER_MINUTE,
+                 max_keys=LOGIN_LIMITER_MAX_KEYS):
+        self.users = TokenBuckets(user_burst, user_per_minute / 60.0, max_keys)
+        self.clients = TokenBuckets(client_burst, client_per_minute / 60.0, max_keys)
+        self.enabled = True
+        self.allowed = 0
+        self.rejected_users = 0
+        self.rejected_clients = 0
+
+    def check(self, username, client=None):
+        """Count an attempt, raising LoginThrottled if the username or the client is over its limit."""
+        if not self.enabled:
+            return
+        if client is not None:
+            wait = self.clients.take(client)
+            if wait:
+                self.rejected_clients += 1
+                raise LoginThrottled(f"Too many sign-in attempts, try again in {wait:.0f} seconds", wait)
+        wait = self.users.take((username or '').strip().lower())
+        if wait:
+            self.rejected_users += 1
+            raise LoginThrottled(f"Too many attempts for this account, try again in {wait:.0f} seconds", wait)
+        self.allowed += 1
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'allowed': self.allowed,
+            'rejected_users': self.rejected_users,
+            'rejected_clients': self.rejected_clients,
+            'tracked_users': len(self.users),
+            'tracked_clients': len(self.clients),
+            'max_keys': self.users.max_keys,
+            'evictions': self.users.evictions + self.clients.evictions
+        }
+
+    def clear(self):
+        self.users.clear()
+        self.clients.clear()
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+def get_login_limiter():
+    """The process-wide sign-in limiter, created on first use."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = LoginRateLimiter()
+    return _limiter
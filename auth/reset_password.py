@@ -1,14 +1,8 @@
 
-import bcrypt
+from auth.auth_handler import hash_password
 from models.database import User, get_session
 import sys
 
-def hash_password(password):
-    """Hash a password for storage"""
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
-
 def reset_user_password(username, new_password):
     """Reset a user's password"""
     session = get_session()
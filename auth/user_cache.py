@@ -0,0 +1,72 @@
+import os
+
+from models.database import User, get_session
+from utils.cache import QueryCache
+
+# Snapshots shared by every session in this server process; the TTL bounds how long a change
+# made by another process (e.g. the reset_password script) can go unseen
+user_cache = QueryCache(
+    max_entries=int(os.getenv('USER_CACHE_SIZE', '1024')),
+    ttl_seconds=int(os.getenv('USER_CACHE_TTL', '300'))
+)
+
+class UserSnapshot:
+    """Read-only copy of a user's profile, safe to keep in st.session_state.
+
+    Unlike a User instance it is bound to no database session, so reading an attribute
+    never triggers a lazy load or a DetachedInstanceError. The password hash is left out
+    on purpose; password checks go through auth_handler.change_password.
+    """
+
+    __slots__ = (
+        'id', 'username', 'email', 'first_name', 'surname', 'id_number',
+        'department', 'job_title', 'two_factor_enabled', 'created_at'
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields.get(name))
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(**{name: getattr(user, name) for name in cls.__slots__})
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __reduce__(self):
+        return _restore_snapshot, (tuple(getattr(self, name) for name in self.__slots__),)
+
+    def __eq__(self, other):
+        if not isinstance(other, UserSnapshot):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"UserSnapshot(id={self.id!r}, username={self.username!r})"
+
+def _restore_snapshot(values):
+    return UserSnapshot(**dict(zip(UserSnapshot.__slots__, values)))
+
+def snapshot_user(user):
+    """Snapshot a freshly loaded User (e.g. at login) and keep it in the cache."""
+    snapshot = UserSnapshot.from_user(user)
+    user_cache.set(snapshot.id, snapshot)
+    return snapshot
+
+def get_user_snapshot(user_id):
+    """The cached snapshot of a user, loading it on a miss; None if the user no longer exists."""
+    def load():
+        user = get_session().get(User, user_id)
+        return UserSnapshot.from_user(user) if user is not None else None
+
+    return user_cache.get_or_compute(user_id, load)
+
+def invalidate_user(user_id):
+    """Drop a user's snapshot after their row changes, so the next read sees the change."""
+    user_cache.invalidate(lambda key: key == user_id)
@@ -0,0 +1,82 @@
+"""Batched least-squares forecaster versus the original per-type sklearn loop,
+plus the seasonal forecaster on a year of hourly data (target: under 100 ms).
+
+Usage:
+    python -m benchmarks.bench_forecaster --sizes 1000 100000 1000000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.ml_predictor import forecast_linear, forecast_seasonal, predict_waste
+
+WASTE_TYPES = ["Paper", "Plastic", "PET", "Toxic"]
+
+
+def predict_waste_sklearn(historical_data):
+    """The previous implementation: one LinearRegression fit per hard-coded waste type."""
+    from sklearn.linear_model import LinearRegression
+
+    predictions = pd.DataFrame()
+    last_date = historical_data.index[-1]
+    future_dates = pd.date_range(start=last_date + timedelta(days=1), periods=30, freq='D')
+
+    for waste_type in WASTE_TYPES:
+        X = np.array(range(len(historical_data))).reshape(-1, 1)
+        y = historical_data[waste_type].values
+        model = LinearRegression()
+        model.fit(X, y)
+        X_future = np.array(range(len(historical_data), len(historical_data) + len(future_dates))).reshape(-1, 1)
+        predictions[waste_type] = model.predict(X_future)
+
+    predictions.index = future_dates
+    return predictions
+
+
+def make_history(size, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(end=pd.Timestamp.now().normalize(), periods=size, freq='h')
+    trend = np.linspace(0, 5, size)[:, None]
+    values = rng.normal([20, 15, 10, 5], [5, 3, 2, 1], (size, len(WASTE_TYPES))) + trend
+    return pd.DataFrame(values, index=index, columns=WASTE_TYPES)
+
+
+def time_call(func, data, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(data)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'points':>10} {'sklearn ms':>11} {'batched ms':>11} {'+intervals':>11} {'speedup':>8} {'max diff':>10}")
+    for size in args.sizes:
+        data = make_history(size)
+        diff = np.abs(predict_waste_sklearn(data).to_numpy() - predict_waste(data).to_numpy()).max()
+        old_ms = time_call(predict_waste_sklearn, data, args.repeat)
+        new_ms = time_call(predict_waste, data, args.repeat)
+        interval_ms = time_call(forecast_linear, data, args.repeat)
+        print(f"{size:>10} {old_ms:>11.2f} {new_ms:>11.2f} {interval_ms:>11.2f} {old_ms / new_ms:>7.1f}x {diff:>10.2e}")
+
+    year_hourly = make_history(365 * 24)
+    seasonal_ms = time_call(forecast_seasonal, year_hourly, args.repeat)
+    print(f"\nseasonal forecast, 1 year hourly x {len(WASTE_TYPES)} series: {seasonal_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
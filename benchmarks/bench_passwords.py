@@ -0,0 +1,80 @@
+"""Logins per second at different bcrypt costs.
+
+Each client thread plays a user signing in repeatedly. "inline" checks the password on
+the client's own thread, as the login page did before; "pool" goes through
+PasswordService with --workers hashing threads. Latency is per login, including the
+wait for a worker.
+
+Usage:
+    python -m benchmarks.bench_passwords --costs 10 11 12 --clients 8 --logins 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt
+
+from auth.password_service import PASSWORD_HASH_WORKERS, PasswordService
+
+PASSWORD = "correct horse battery staple"
+
+
+def run_clients(login, clients, logins):
+    """Run `logins` logins on each of `clients` threads; return (logins/sec, p50 ms, p95 ms)."""
+    latencies = []
+    lock = threading.Lock()
+
+    def client():
+        for _ in range(logins):
+            started = time.perf_counter()
+            assert login()
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - started
+
+    latencies.sort()
+    p95 = latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)]
+    return clients * logins / seconds, statistics.median(latencies), p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--costs', type=int, nargs='+', default=[10, 11, 12])
+    parser.add_argument('--clients', type=int, default=8, help="Concurrent users signing in")
+    parser.add_argument('--logins', type=int, default=4, help="Logins per client")
+    parser.add_argument('--workers', type=int, default=PASSWORD_HASH_WORKERS, help="Hashing threads in the pool")
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs, {args.clients} clients x {args.logins} logins, {args.workers} pool workers\n")
+    print(f"{'cost':>4} {'mode':>7} {'hash ms':>8} {'logins/sec':>11} {'p50 ms':>9} {'p95 ms':>9}")
+    for cost in args.costs:
+        service = PasswordService(rounds=cost, max_workers=args.workers, max_queued=args.clients)
+        started = time.perf_counter()
+        stored = service.hash(PASSWORD)
+        hash_ms = (time.perf_counter() - started) * 1000
+        encoded = stored.encode('utf-8')
+
+        modes = {
+            'inline': lambda: bcrypt.checkpw(PASSWORD.encode('utf-8'), encoded),
+            'pool': lambda: service.verify(stored, PASSWORD)
+        }
+        for mode, login in modes.items():
+            rate, p50, p95 = run_clients(login, args.clients, args.logins)
+            print(f"{cost:>4} {mode:>7} {hash_ms:>8.1f} {rate:>11.1f} {p50:>9.1f} {p95:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
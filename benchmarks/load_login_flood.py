@@ -0,0 +1,137 @@
+"""Dashboard latency under a flood of bad sign-ins, with and without the sign-in limiter.
+
+Seeds a temporary SQLite database, then repeatedly runs the uncached work of one
+dashboard rerun (aggregate query, frame, aggregates, forecast and prediction chart)
+for --seconds in three phases: no sign-ins, a flood with the limiter disabled, and the
+same flood with it enabled. The flood is --attackers threads, each a different client
+posting wrong passwords for an existing account as fast as it is answered.
+
+Usage:
+    python -m benchmarks.load_login_flood --attackers 8 --seconds 10 --cost 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def dashboard_rerun():
+    from models.database import WASTE_TYPES, get_session, remove_session
+    from models.queries import get_time_window_start, waste_totals_frame, waste_totals_query
+    from utils.aggregates import compute_aggregates
+    from utils.ml_predictor import forecast_linear
+    from utils.visualizations import create_prediction_chart
+
+    history = waste_totals_frame(waste_totals_query(get_session(), 'day', None, get_time_window_start("Last Year")).all())
+    aggregates = compute_aggregates(history)
+    predictions, lower, upper = forecast_linear(history)
+    create_prediction_chart(history, predictions, WASTE_TYPES, intervals=(lower, upper), aggregates=aggregates)
+    remove_session()
+
+
+def run_phase(name, seconds, attackers, username):
+    from auth.auth_handler import authenticate_user
+    from auth.password_service import PasswordServiceBusy, get_password_service
+    from auth.rate_limiter import LoginThrottled
+    from models.database import remove_session
+
+    stop = threading.Event()
+    outcomes = {'answered': 0, 'throttled': 0, 'busy': 0}
+    lock = threading.Lock()
+
+    def attack(number):
+        client = f"10.0.0.{number}"
+        while not stop.is_set():
+            try:
+                authenticate_user(username, 'wrong password', client=client)
+                outcome = 'answered'
+            except LoginThrottled:
+                outcome = 'throttled'
+                # A real client waits for the response round trip before trying again
+                time.sleep(0.01)
+            except PasswordServiceBusy:
+                outcome = 'busy'
+                time.sleep(0.01)
+            finally:
+                remove_session()
+            with lock:
+                outcomes[outcome] += 1
+
+    verifications = get_password_service().verifications
+    threads = [threading.Thread(target=attack, args=(number,), daemon=True) for number in range(attackers)]
+    for thread in threads:
+        thread.start()
+
+    latencies = []
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        dashboard_rerun()
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    return {
+        'phase': name,
+        'reruns': len(latencies),
+        'p50_ms': statistics.median(latencies),
+        'p95_ms': latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)],
+        'attempts': sum(outcomes.values()),
+        'hashed': get_password_service().verifications - verifications,
+        'throttled': outcomes['throttled'],
+        'busy': outcomes['busy']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--attackers', type=int, default=8, help="Flooding clients")
+    parser.add_argument('--seconds', type=float, default=10, help="Length of each phase")
+    parser.add_argument('--cost', type=int, default=10, help="bcrypt cost of the targeted account")
+    parser.add_argument('--size', type=int, default=20000, help="Waste entries to seed")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tmp, 'flood.db')}"
+        from auth.auth_handler import create_user
+        from auth.password_service import get_password_service
+        from auth.rate_limiter import get_login_limiter
+        from benchmarks.dashboard_bench import seed_database
+
+        print(f"Seeding {args.size:,} entries...")
+        seed_database(args.size)
+        get_password_service().rounds = args.cost
+        create_user('kiosk', 'kiosk@example.com', 'right password', 'Warehouse', 'Operator')
+        dashboard_rerun()
+
+        limiter = get_login_limiter()
+        results = [run_phase('no sign-ins', args.seconds, 0, 'kiosk')]
+        limiter.enabled = False
+        results.append(run_phase('flood, no limiter', args.seconds, args.attackers, 'kiosk'))
+        limiter.enabled = True
+        limiter.clear()
+        results.append(run_phase('flood, limiter', args.seconds, args.attackers, 'kiosk'))
+
+        from models.database import get_engine, remove_session
+        remove_session()
+        get_engine().dispose()
+
+    print(f"\n{os.cpu_count()} CPUs, {args.attackers} attackers, bcrypt cost {args.cost}, "
+          f"{get_password_service().max_workers} hash workers\n")
+    print(f"{'phase':<20} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'attempts':>9} {'hashed':>7} "
+          f"{'throttled':>10} {'busy':>6}")
+    for r in results:
+        print(f"{r['phase']:<20} {r['reruns']:>7} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['attempts']:>9} "
+              f"{r['hashed']:>7} {r['throttled']:>10} {r['busy']:>6}")
+
+
+if __name__ == "__main__":
+    main()
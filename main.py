@@ -1,7 +1,6 @@
 import streamlit as st
 import sys
 import os
-from sqlalchemy import func, cast, Numeric
 
 
 # Add the current directory to the path so Python can find the modules
@@ -19,300 +18,506 @@ st.set_page_config(
 import pandas as pd
 from datetime import datetime, timedelta
 from utils.data_generator import generate_historical_data
-from utils.ml_predictor import predict_waste
+from utils.ml_predictor import forecast_linear, forecast_seasonal, sampling_step
+from utils.forecast_store import forecast_department
 from utils.visualizations import (
     create_waste_distribution,
     create_time_analysis,
     get_waste_insights,
     create_prediction_chart,
+    create_live_chart,
     create_summary_metrics
 )
+from auth.user_cache import get_user_snapshot
 from pages.auth import show_auth_page
 from pages.profile import show_profile_page
 from pages.admin import show_admin_panel
-from models.database import get_session, WasteEntry
-from sqlalchemy import func
-
-# Load custom CSS
-with open('assets/styles.css') as f:
-    st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
-
-# Initialize session state
-if 'authenticated' not in st.session_state:
-    st.session_state['authenticated'] = False
-
-if 'user' not in st.session_state:
-    st.session_state['user'] = None
-
-# Authentication check
-if 'authenticated' not in st.session_state or not st.session_state['authenticated']:
-    show_auth_page()
-else:
-    user = st.session_state['user']
-
-    # Title and description
-    st.title("🗑️ Waste Segregation Analytics Dashboard")
-    st.markdown(f"""
-    Welcome, **{user.username}** from **{user.department}** department!
-    This interactive dashboard provides comprehensive insights into waste segregation patterns.
-    """)
-
-    # Sidebar filters
-    st.sidebar.header("📊 Analysis Controls")
-
-    # Sidebar navigation
-    with st.sidebar:
-        st.title("Navigation")
-
-        if st.session_state['authenticated']:
-            st.write(f"Welcome, {st.session_state['user'].username}!")
-
-            if 'current_page' not in st.session_state:
-                st.session_state['current_page'] = 'dashboard'
-
-            # Dashboard button
-            if st.button("Dashboard", use_container_width=True):
-                st.session_state['current_page'] = 'dashboard'
-                st.rerun()
-
-            # Analysis button
-            if st.button("Analysis", use_container_width=True):
-                st.session_state['current_page'] = 'analysis'
-                st.rerun()
-
-            # Data Entry button
-            if st.button("Data Entry", use_container_width=True):
-                st.session_state['current_page'] = 'data_entry'
-                st.rerun()
-
-            # Profile button
-            if st.button("My Profile", use_container_width=True):
-                st.session_state['current_page'] = 'profile'
-                st.rerun()
-
-            # Admin panel for admin users
-            if st.session_state['user'].job_title.lower() in ['admin', 'administrator', 'manager']:
-                if st.button("Admin Panel", use_container_width=True):
-                    st.session_state['current_page'] = 'admin'
-                    st.rerun()
+from models.database import get_session, remove_session, WASTE_TYPES
+from models.queries import GRANULARITIES
+from utils.aggregates import compute_aggregates
+from utils.dashboard_data import (
+    cached_figure,
+    load_waste_history,
+    load_waste_aggregates,
+    load_department_stats,
+    invalidate_departments
+)
+from utils.ingest import IngestError, ingest_file, insert_rows
+from utils.live_feed import get_live_feed
+from utils.refresh_worker import get_dashboard_state, start_refresh_worker
+from utils.tracing import current_trace, span, start_trace, finish_trace
 
-            # Settings button
-            if st.button("Settings", use_container_width=True):
-                st.session_state['current_page'] = 'settings'
-                st.rerun()
-
-            # Logout button
-            if st.button("Logout", use_container_width=True):
-                st.session_state['authenticated'] = False
-                st.session_state['user'] = None
-                st.session_state['current_page'] = 'auth'
-                st.rerun()
-        else:
-            st.info("Please log in to access the dashboard.")
-
-    date_range = st.sidebar.selectbox(
-        "Time Range",
-        ["Last Week", "Last Month", "Last Year"],
-        help="Select the time period for analysis"
-    )
-
-    waste_type = st.sidebar.multiselect(
-        "Waste Types",
-        ["Paper", "Plastic", "PET", "Toxic"],
-        default=["Paper", "Plastic", "PET", "Toxic"],
-        help="Choose which types of waste to display"
-    )
-
-    department_filter = st.sidebar.selectbox(
-        "Department Filter",
-        ["All Departments", user.department],
-        help="Filter data by department"
-    )
-
-    # Get data from database
-    session = get_session()
-    query = session.query(
-        WasteEntry.waste_type,
-        func.round(cast(func.sum(WasteEntry.amount), Numeric(10, 2)), 2).label('total_amount'),
-        func.to_char(WasteEntry.timestamp, 'YYYY-MM-DD').label('date'),  # Extract date
-        func.to_char(WasteEntry.timestamp, 'HH24:MI:SS').label('time')  # Extract time
-    )
-
-    if department_filter != "All Departments":
-        query = query.filter(WasteEntry.department == department_filter)
-
-    query = query.group_by(
-        WasteEntry.waste_type,
-        func.to_char(WasteEntry.timestamp, 'YYYY-MM-DD').label('date'),  # Extract date
-        func.to_char(WasteEntry.timestamp, 'HH24:MI:SS').label('time')  # Extract time
-    )
-
-    results = query.all()
-
-    # Convert to DataFrame
-    if results:
-        historical_data = pd.DataFrame(results)
-        historical_data.set_index('date', inplace=True)
-    else:
-        historical_data = generate_historical_data(date_range)  # Use mock data if no real data
-
-    # Layout
-    col1, col2 = st.columns([1, 2])
-
-    with col1:
-        st.subheader("📊 Current Distribution")
-        dist_fig = create_waste_distribution(historical_data.iloc[-1])
-        st.plotly_chart(dist_fig, use_container_width=True)
-
-        # Add waste entry form
-        st.subheader("➕ Add Waste Entry")
-        with st.form("waste_entry"):
-            new_waste_type = st.selectbox("Waste Type", ["Paper", "Plastic", "PET", "Toxic"])
-            amount = st.number_input("Amount (kg)", min_value=0.1, step=0.1)
-
-            if st.form_submit_button("Add Entry"):
-                new_entry = WasteEntry(
-                    user_id=user.id,
-                    department=user.department,
-                    waste_type=new_waste_type,
-                    amount=amount
-                )
-                session.add(new_entry)
-                session.commit()
-                st.success("Entry added successfully!")
-                st.rerun()
+start_trace("dashboard")
 
-        # Key Insights
-        st.subheader("💡 Key Insights")
-        insights = get_waste_insights(historical_data)
+# Precomputes history, insights and forecasts for every department in the background (once per server)
+start_refresh_worker()
 
-        for insight in insights:
-            st.info(
-                f"""
-                **{insight['title']}**
+def render_app():
+    # Load custom CSS
+    with open('assets/styles.css') as f:
+        st.markdown(f'<style>{f.read()}</style>', unsafe_allow_html=True)
 
-                {insight['trend']} {insight['value']}
+    # Initialize session state
+    if 'authenticated' not in st.session_state:
+        st.session_state['authenticated'] = False
 
-                _{insight['description']}_
-                """
-            )
+    if 'user' not in st.session_state:
+        st.session_state['user'] = None
 
-    with col2:
-        st.subheader("📈 Time Analysis")
-        time_fig = create_time_analysis(historical_data[waste_type], waste_type)
-        st.plotly_chart(time_fig, use_container_width=True)
-
-        # Add ML predictions
-        st.subheader("🔮 Waste Forecasting")
-
-        # Generate predictions using our ML model
-        predictions = predict_waste(historical_data)
-
-        # Create prediction visualization
-        pred_fig = create_prediction_chart(historical_data, predictions, waste_type)
-        st.plotly_chart(pred_fig, use_container_width=True)
-
-        # Display summary metrics with trend indicators
-        st.subheader("📊 Forecast Metrics")
-        metrics = create_summary_metrics(historical_data, predictions)
-
-        # Display metrics in columns
-        metric_cols = st.columns(len(metrics))
-        for i, metric in enumerate(metrics):
-            with metric_cols[i]:
-                st.metric(
-                    label=metric['waste_type'],
-                    value=f"{metric['current']:.1f} kg",
-                    delta=f"{metric['change']:.1f}%",
-                    delta_color="normal"
-                )
+    # Authentication check
+    if 'authenticated' not in st.session_state or not st.session_state['authenticated']:
+        show_auth_page()
+    else:
+        # Identity comes from the process-wide snapshot cache, so a rerun costs no query for it
+        # and profile or admin edits (which invalidate the cache) show up on the next rerun
+        user = get_user_snapshot(st.session_state['user'].id)
+        if user is None:
+            # The account was deleted while signed in
+            st.session_state['authenticated'] = False
+            st.session_state['user'] = None
+            st.rerun()
+        st.session_state['user'] = user
+
+        # Title and description
+        st.title("🗑️ Waste Segregation Analytics Dashboard")
+        st.markdown(f"""
+        Welcome, **{user.username}** from **{user.department}** department!
+        This interactive dashboard provides comprehensive insights into waste segregation patterns.
+        """)
+
+        # Sidebar filters
+        st.sidebar.header("📊 Analysis Controls")
+
+        # Sidebar navigation
+        with st.sidebar:
+            st.title("Navigation")
+
+            if st.session_state['authenticated']:
+                st.write(f"Welcome, {st.session_state['user'].username}!")
+
+                if 'current_page' not in st.session_state:
+                    st.session_state['current_page'] = 'dashboard'
+
+                # Dashboard button
+                if st.button("Dashboard", use_container_width=True):
+                    st.session_state['current_page'] = 'dashboard'
+                    st.rerun()
 
-    # Department Statistics
-    st.subheader("📋 Department Statistics")
-
-    # Get department statistics
-    dept_stats = session.query(
-        WasteEntry.department,
-        func.sum(WasteEntry.amount).label('total_amount'),
-        func.count(WasteEntry.id).label('entry_count')
-    ).group_by(WasteEntry.department).all()
-
-    if dept_stats:
-        # Create tabs for different department views
-        dept_tab1, dept_tab2 = st.tabs(["Department Metrics", "Department Comparison"])
-
-        with dept_tab1:
-            # Display department metrics in cards
-            st.markdown('<div class="metric-container">', unsafe_allow_html=True)
-            dept_cols = st.columns(len(dept_stats))
-
-            for i, (dept, total, count) in enumerate(dept_stats):
-                with dept_cols[i]:
-                    st.markdown(f"""
-                    <div class="department-card">
-                        <h3>{dept}</h3>
-                        <p class="metric-value">{total:.1f} kg</p>
-                        <p class="metric-title">Total Waste ({count} entries)</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-
-        with dept_tab2:
-            # Create department comparison chart
-            import plotly.express as px
-
-            dept_df = pd.DataFrame([
-                {"Department": dept, "Total Waste (kg)": total, "Entry Count": count}
-                for dept, total, count in dept_stats
-            ])
-
-            fig = px.bar(
-                dept_df, 
-                x="Department", 
-                y="Total Waste (kg)",
-                color="Department",
-                text="Total Waste (kg)",
-                title="Department Waste Comparison"
-            )
+                # Analysis button
+                if st.button("Analysis", use_container_width=True):
+                    st.session_state['current_page'] = 'analysis'
+                    st.rerun()
+
+                # Data Entry button
+                if st.button("Data Entry", use_container_width=True):
+                    st.session_state['current_page'] = 'data_entry'
+                    st.rerun()
 
-            fig.update_layout(height=400)
-            st.plotly_chart(fig, use_container_width=True)
+                # Profile button
+                if st.button("My Profile", use_container_width=True):
+                    st.session_state['current_page'] = 'profile'
+                    st.rerun()
+
+                # Admin panel for admin users
+                if st.session_state['user'].job_title.lower() in ['admin', 'administrator', 'manager']:
+                    if st.button("Admin Panel", use_container_width=True):
+                        st.session_state['current_page'] = 'admin'
+                        st.rerun()
 
-            # Department efficiency metrics
-            st.subheader("Departmental Efficiency Metrics")
+                # Settings button
+                if st.button("Settings", use_container_width=True):
+                    st.session_state['current_page'] = 'settings'
+                    st.rerun()
 
-            # Add per-employee metrics if data available
-            if 'employee_count' in st.session_state:
-                efficiency_df = dept_df.copy()
-                efficiency_df["Waste per Employee"] = efficiency_df["Total Waste (kg)"] / st.session_state.employee_count
-                st.dataframe(efficiency_df, height=200, use_container_width=True)
+                # Logout button
+                if st.button("Logout", use_container_width=True):
+                    st.session_state['authenticated'] = False
+                    st.session_state['user'] = None
+                    st.session_state['current_page'] = 'auth'
+                    st.rerun()
             else:
-                st.info("Employee data not available. Add employee counts to see efficiency metrics.")
-
-    # Show raw data option
-    if st.checkbox("📋 Show Raw Data"):
-        st.dataframe(
-            historical_data[waste_type],
-            height=300,
-            use_container_width=True
+                st.info("Please log in to access the dashboard.")
+
+        date_range = st.sidebar.selectbox(
+            "Time Range",
+            ["Last Week", "Last Month", "Last Year"],
+            help="Select the time period for analysis"
         )
 
-    # Future Improvements Section
-    st.sidebar.markdown("""
-    ---
-    ### 🚀 Upcoming Features
-    - Real-time data integration
-    - Waste composition analysis
-    - Predictive maintenance alerts
-    - Custom report generation
-    - Environmental impact metrics
-    """)
-
-    # Page routing
-    if not st.session_state['authenticated']:
-        # Show authentication page
-        show_auth_page()
-    else:
-        # Get current page from session state or default to dashboard
-        current_page = st.session_state.get('current_page', 'dashboard')
+        waste_type = st.sidebar.multiselect(
+            "Waste Types",
+            WASTE_TYPES,
+            default=WASTE_TYPES,
+            help="Choose which types of waste to display"
+        )
 
-        
\ No newline at end of file
+        department_filter = st.sidebar.selectbox(
+            "Department Filter",
+            ["All Departments", user.department],
+            help="Filter data by department"
+        )
+        selected_department = None if department_filter == "All Departments" else department_filter
+
+        forecast_model = st.sidebar.selectbox(
+            "Forecast Model",
+            ["Linear Trend", "Seasonal"],
+            help="Seasonal adds weekly and annual cycles on top of the trend"
+        )
+
+        granularity = st.sidebar.selectbox(
+            "Granularity",
+            list(GRANULARITIES),
+            index=1,
+            help="Bucket size of the trend chart, its forecast and the raw data"
+        )
+
+        live_mode = st.sidebar.toggle(
+            "📡 Live Mode",
+            help="Refresh today's figures every few seconds with only the entries added since the last refresh"
+        )
+        live_seconds = st.sidebar.slider("Refresh every (seconds)", 2, 60, 5) if live_mode else None
+
+        # Only this fragment reruns on the live timer; the rest of the page keeps its last render
+        def show_live_panel():
+            feed = get_live_feed(selected_department, date_range)
+            with span("live poll", "data"):
+                live_data = feed.poll()
+
+            st.subheader("📡 Live")
+            if live_data.empty:
+                st.info("Waiting for the first waste entries...")
+            else:
+                today = pd.Timestamp(datetime.utcnow().date())
+                today_totals = live_data.loc[today] if today in live_data.index else None
+                live_cols = st.columns(len(WASTE_TYPES) + 1)
+                for i, live_type in enumerate(WASTE_TYPES):
+                    live_cols[i].metric(f"{live_type} today", f"{today_totals[live_type] if today_totals is not None else 0:.1f} kg")
+                live_cols[-1].metric("New entries", feed.new_entries)
+
+                with span("create_live_chart", "plotly"):
+                    live_fig = create_live_chart(live_data, waste_type)
+                with span("render live chart", "plotly"):
+                    st.plotly_chart(live_fig, use_container_width=True)
+
+                if feed.recent:
+                    st.dataframe(
+                        pd.DataFrame(list(feed.recent), columns=["Time (UTC)", "Waste Type", "Amount (kg)"]),
+                        height=200,
+                        use_container_width=True,
+                        hide_index=True
+                    )
+            st.caption(f"Updated {feed.updated_at:%H:%M:%S} UTC · polling every {live_seconds}s")
+
+        @st.fragment(run_every=live_seconds)
+        def live_panel():
+            # Timer reruns of the fragment are traced (and clean up) on their own; full reruns already are
+            if current_trace() is not None:
+                show_live_panel()
+                return
+            start_trace("live")
+            try:
+                show_live_panel()
+            finally:
+                finish_trace()
+                remove_session()
+
+        if live_mode:
+            live_panel()
+
+        # Get data for the selected time range: precomputed by the refresh worker when it is current,
+        # otherwise loaded here (cached per department filter and range)
+        session = get_session()
+        state = get_dashboard_state(selected_department, date_range)
+        if state is not None:
+            historical_data = state.history
+        else:
+            with span("load_waste_history", "data"):
+                historical_data = load_waste_history(selected_department, date_range)
+
+        using_sample_data = historical_data.empty
+        if using_sample_data:
+            state = None
+            with span("generate_historical_data", "data"):
+                historical_data = generate_historical_data(date_range)  # Use mock data if no real data
+            st.info(
+                f"No waste entries for {selected_department or 'any department'} in the {date_range.lower()}. "
+                "The figures below are randomly generated sample data, not real readings."
+            )
+
+        # Monthly, weekday and overall rollups shared by every chart and insight below
+        with span("aggregates", "pandas"):
+            if state is not None:
+                aggregates = state.aggregates
+            elif using_sample_data:
+                aggregates = compute_aggregates(historical_data)
+            else:
+                aggregates = load_waste_aggregates(selected_department, date_range)
+
+        def chart_figure(name, params, build):
+            # Real data figures are reused until the department's data changes; sample data is random per rerun
+            if using_sample_data:
+                return build()
+            return cached_figure(name, selected_department, (date_range,) + tuple(params), build)
+
+        # Layout
+        col1, col2 = st.columns([1, 2])
+
+        with col1:
+            st.subheader("📊 Current Distribution")
+            with span("create_waste_distribution", "plotly"):
+                dist_fig = chart_figure("distribution", (), lambda: create_waste_distribution(historical_data.iloc[-1]))
+            with span("render distribution chart", "plotly"):
+                st.plotly_chart(dist_fig, use_container_width=True)
+
+            # Add waste entry form
+            st.subheader("➕ Add Waste Entry")
+            with st.form("waste_entry"):
+                new_waste_type = st.selectbox("Waste Type", WASTE_TYPES)
+                amount = st.number_input("Amount (kg)", min_value=0.1, step=0.1)
+
+                if st.form_submit_button("Add Entry"):
+                    new_entry = pd.DataFrame([{
+                        'user_id': user.id,
+                        'department': user.department,
+                        'waste_type': new_waste_type,
+                        'amount': amount,
+                        'timestamp': datetime.utcnow()
+                    }])
+                    # Same write path as imports, which also updates the rollups
+                    insert_rows(new_entry)
+                    invalidate_departments([user.department])
+                    st.success("Entry added successfully!")
+                    st.rerun()
+
+            # Bulk import of weighing station exports
+            with st.expander("📥 Bulk Import (CSV / Parquet)"):
+                st.caption("Columns: department, waste_type, amount, and optionally timestamp and user_id")
+                upload = st.file_uploader("Readings file", type=["csv", "parquet"])
+
+                if upload is not None and st.button("Import File"):
+                    progress_text = st.empty()
+                    # The entry form writes to the user's own department; only admins may import for others
+                    is_admin = user.job_title.lower() in ['admin', 'administrator', 'manager']
+                    try:
+                        report = ingest_file(
+                            upload,
+                            user_id=user.id,
+                            departments=None if is_admin else [user.department],
+                            progress=lambda r: progress_text.text(
+                                f"{r.rows_read:,} rows read ({r.rows_per_second:,.0f} rows/sec)"
+                            )
+                        )
+                    except IngestError as e:
+                        progress_text.empty()
+                        st.error(f"❌ {e}")
+                        report = e.report
+                    else:
+                        progress_text.empty()
+                        st.success(report.summary())
+                    for error in report.errors[:10]:
+                        st.warning(error)
+
+            # Key Insights
+            st.subheader("💡 Key Insights")
+            with span("get_waste_insights", "pandas"):
+                insights = state.insights if state is not None else get_waste_insights(historical_data, aggregates=aggregates)
+
+            for insight in insights:
+                st.info(
+                    f"""
+                    **{insight['title']}**
+
+                    {insight['trend']} {insight['value']}
+
+                    _{insight['description']}_
+                    """
+                )
+
+        with col2:
+            st.subheader("📈 Time Analysis")
+            with span("create_time_analysis", "plotly"):
+                time_fig = chart_figure(
+                    "time_analysis", tuple(waste_type),
+                    lambda: create_time_analysis(historical_data[waste_type], waste_type, aggregates=aggregates)
+                )
+            with span("render time analysis chart", "plotly"):
+                st.plotly_chart(time_fig, use_container_width=True)
+
+            # Add ML predictions
+            st.subheader("🔮 Waste Forecasting")
+
+            # The trend chart can show hourly, weekly or monthly buckets, summed in the database;
+            # sample data and windows too short for two buckets stay daily
+            bucket = GRANULARITIES[granularity]
+            trend_data = historical_data
+            if bucket != 'day' and not using_sample_data:
+                with span("load_waste_history", "data"):
+                    bucketed = load_waste_history(selected_department, date_range, bucket)
+                if len(bucketed) >= 2:
+                    trend_data = bucketed
+                else:
+                    st.caption(f"Too little data for {granularity.lower()}ly buckets; showing daily totals.")
+                    bucket = 'day'
+
+            if len(trend_data) < 2:
+                st.info("Forecasts need at least two days of data; add more entries or choose a longer time range.")
+            else:
+                # Forecasts come from the refresh worker when current; otherwise linear forecasts come from the
+                # stored per-department models, refitting only on days added since the last fit, and sample
+                # data (or too little history) is fitted directly. Other granularities fit their own buckets.
+                with span("forecast", "forecast"):
+                    forecast = state.forecasts.get(forecast_model) if state is not None and bucket == 'day' else None
+                    if forecast is None and bucket != 'day':
+                        if forecast_model == "Seasonal":
+                            forecast = forecast_seasonal(load_waste_history(selected_department, "Last Year", bucket))
+                        else:
+                            # Same 30-day horizon as the daily forecast, in buckets of the chosen size
+                            horizon = max(int(round(pd.Timedelta(days=30) / sampling_step(trend_data.index))), 1)
+                            forecast = forecast_linear(trend_data, periods=horizon)
+                    if forecast is None:
+                        if forecast_model == "Seasonal":
+                            # Fit on a full year so the weekly and annual cycles can be estimated
+                            seasonal_history = historical_data if using_sample_data else load_waste_history(selected_department, "Last Year")
+                            forecast = forecast_seasonal(seasonal_history)
+                        elif not using_sample_data:
+                            forecast = forecast_department(session, selected_department)
+                    if forecast is None:
+                        forecast = forecast_linear(historical_data)
+                    predictions, lower, upper = forecast
+
+                # Long histories are downsampled to the chart width; zooming plots the chosen range at full resolution
+                x_range = None
+                first_day, last_day = trend_data.index.min().date(), trend_data.index.max().date()
+                if first_day < last_day:
+                    with st.expander("🔍 Zoom into history"):
+                        zoom = st.slider("Date range", min_value=first_day, max_value=last_day, value=(first_day, last_day))
+                    if zoom != (first_day, last_day):
+                        x_range = zoom
+
+                # Create prediction visualization
+                with span("create_prediction_chart", "plotly"):
+                    # Forecasts also change with the model choice and from one day to the next
+                    pred_fig = chart_figure(
+                        "prediction", (tuple(waste_type), forecast_model, bucket, x_range, datetime.utcnow().date()),
+                        lambda: create_prediction_chart(
+                            trend_data, predictions, waste_type, intervals=(lower, upper), aggregates=aggregates,
+                            x_range=x_range
+                        )
+                    )
+                with span("render prediction chart", "plotly"):
+                    st.plotly_chart(pred_fig, use_container_width=True)
+
+                # Display summary metrics with trend indicators
+                st.subheader("📊 Forecast Metrics")
+                with span("create_summary_metrics", "pandas"):
+                    metrics = create_summary_metrics(trend_data, predictions)
+
+                # Display metrics in columns
+                metric_cols = st.columns(len(metrics))
+                for i, metric in enumerate(metrics):
+                    with metric_cols[i]:
+                        st.metric(
+                            label=metric['waste_type'],
+                            value=f"{metric['current']:.1f} kg",
+                            delta=f"{metric['change']:.1f}%" if metric['change'] is not None else None,
+                            delta_color="normal"
+                        )
+
+        # Department Statistics
+        st.subheader("📋 Department Statistics")
+
+        # Get department statistics for the selected window and department, plus all-time running totals
+        with span("load_department_stats", "data"):
+            dept_stats = load_department_stats(selected_department, date_range)
+            all_time_totals = {dept: total for dept, total, count in load_department_stats(selected_department)}
+
+        if dept_stats:
+            # Create tabs for different department views
+            dept_tab1, dept_tab2 = st.tabs(["Department Metrics", "Department Comparison"])
+
+            with dept_tab1:
+                # Display department metrics in cards
+                st.markdown('<div class="metric-container">', unsafe_allow_html=True)
+                dept_cols = st.columns(len(dept_stats))
+
+                for i, (dept, total, count) in enumerate(dept_stats):
+                    with dept_cols[i]:
+                        st.markdown(f"""
+                        <div class="department-card">
+                            <h3>{dept}</h3>
+                            <p class="metric-value">{total:.1f} kg</p>
+                            <p class="metric-title">{date_range} ({count} entries)</p>
+                            <p class="metric-title">All time: {all_time_totals.get(dept, total):.1f} kg</p>
+                        </div>
+                        """, unsafe_allow_html=True)
+
+            with dept_tab2:
+                # Create department comparison chart
+                import plotly.express as px
+
+                dept_df = pd.DataFrame([
+                    {"Department": dept, "Total Waste (kg)": total, "Entry Count": count}
+                    for dept, total, count in dept_stats
+                ])
+
+                def build_department_chart():
+                    fig = px.bar(
+                        dept_df, 
+                        x="Department", 
+                        y="Total Waste (kg)",
+                        color="Department",
+                        text="Total Waste (kg)",
+                        title=f"Department Waste Comparison ({date_range})"
+                    )
+                    fig.update_layout(height=400)
+                    return fig
+
+                with span("create department chart", "plotly"):
+                    fig = cached_figure("department_bar", selected_department, (date_range,), build_department_chart)
+                with span("render department chart", "plotly"):
+                    st.plotly_chart(fig, use_container_width=True)
+
+                # Department efficiency metrics
+                st.subheader("Departmental Efficiency Metrics")
+
+                # Add per-employee metrics if data available
+                if 'employee_count' in st.session_state:
+                    efficiency_df = dept_df.copy()
+                    efficiency_df["Waste per Employee"] = efficiency_df["Total Waste (kg)"] / st.session_state.employee_count
+                    st.dataframe(efficiency_df, height=200, use_container_width=True)
+                else:
+                    st.info("Employee data not available. Add employee counts to see efficiency metrics.")
+
+        # Show raw data option
+        if st.checkbox("📋 Show Raw Data"):
+            st.dataframe(
+                trend_data[waste_type],
+                height=300,
+                use_container_width=True
+            )
+
+        # Future Improvements Section
+        st.sidebar.markdown("""
+        ---
+        ### 🚀 Upcoming Features
+        - Waste composition analysis
+        - Predictive maintenance alerts
+        - Custom report generation
+        - Environmental impact metrics
+        """)
+
+        # Page routing
+        if not st.session_state['authenticated']:
+            # Show authentication page
+            show_auth_page()
+        else:
+            # Get current page from session state or default to dashboard
+            current_page = st.session_state.get('current_page', 'dashboard')
+
+# Return this rerun's database connection to the pool even when the rerun fails or is cut short
+# by st.rerun()/st.stop(); a session left open after a closed tab would keep it checked out for good
+try:
+    render_app()
+finally:
+    finish_trace()
+    remove_session()
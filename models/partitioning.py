@@ -0,0 +1,299 @@
+"""Monthly time partitioning and archival of waste_entries.
+
+On PostgreSQL waste_entries becomes a table range-partitioned by month on timestamp
+(PostgreSQL 11+), so time-bounded queries only scan the months they touch and old
+months can be detached and dropped without a bulk DELETE. SQLite has no partitioning;
+there closed months older than the hot window are moved out of waste_entries into
+per-period tables (waste_entries_YYYY_MM) so the live table stays small.
+
+Archiving writes a partition or period table to compressed Parquet and drops it. The
+daily rollup and department totals are left alone, so dashboards keep the full history.
+
+Usage:
+    python -m models.partitioning status
+    python -m models.partitioning convert                 # PostgreSQL, one-off
+    python -m models.partitioning create-future --months 3  # PostgreSQL, also run by the refresh worker
+    python -m models.partitioning split --keep-months 12  # SQLite
+    python -m models.partitioning archive --before 2023-01-01 --dir archive/
+"""
+import argparse
+import os
+import re
+from datetime import date, datetime
+
+import pandas as pd
+from sqlalchemy import inspect, text
+
+from models.database import WasteEntry, ensure_indexes, get_engine
+
+TABLE = WasteEntry.__tablename__
+DEFAULT_PARTITION = f"{TABLE}_default"
+PERIOD_TABLE = re.compile(rf"^{TABLE}_(\d{{4}})_(\d{{2}})$")
+ARCHIVE_CHUNK_ROWS = 100000
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def period_table_name(month):
+    """Name of the partition (PostgreSQL) or period table (SQLite) holding a month."""
+    return f"{TABLE}_{month.year:04d}_{month.month:02d}"
+
+def _month_of(table_name):
+    match = PERIOD_TABLE.match(table_name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+def list_periods(engine):
+    """Months that have their own partition or period table, oldest first."""
+    if engine.dialect.name == 'postgresql':
+        with engine.connect() as connection:
+            names = connection.execute(text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = :table"
+            ), {'table': TABLE}).scalars().all()
+    else:
+        names = inspect(engine).get_table_names()
+    return sorted(month for month in map(_month_of, names) if month is not None)
+
+def is_partitioned(engine):
+    if engine.dialect.name != 'postgresql':
+        return False
+    with engine.connect() as connection:
+        return connection.execute(
+            text("SELECT relkind = 'p' FROM pg_class WHERE relname = :table"), {'table': TABLE}
+        ).scalar() or False
+
+# PostgreSQL
+
+def _create_partition(connection, month):
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {period_table_name(month)} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+
+def convert_to_partitioned(engine, months_ahead=3):
+    """Rebuild waste_entries as a monthly range-partitioned table, keeping ids and the sequence.
+
+    Runs in one transaction and copies every row, so schedule it for a quiet period.
+    The primary key becomes (id, timestamp) as PostgreSQL requires the partition key
+    in unique constraints; ids still come from the original sequence.
+    """
+    if engine.dialect.name != 'postgresql':
+        raise RuntimeError("Native partitioning needs PostgreSQL; use split_old_periods on SQLite")
+    if is_partitioned(engine):
+        return False
+
+    legacy = f"{TABLE}_unpartitioned"
+    with engine.begin() as connection:
+        bounds = connection.execute(text(f"SELECT min(timestamp), max(timestamp) FROM {TABLE}")).first()
+        connection.execute(text(f"ALTER TABLE {TABLE} RENAME TO {legacy}"))
+        # Constraint and index names are schema-wide, so free them up for the new table
+        constraints = connection.execute(text(
+            "SELECT conname FROM pg_constraint WHERE conrelid = CAST(:table AS regclass)"
+        ), {'table': legacy}).scalars().all()
+        for name in constraints:
+            connection.execute(text(f"ALTER TABLE {legacy} RENAME CONSTRAINT {name} TO {name}_unpartitioned"))
+        for index in WasteEntry.__table__.indexes:
+            connection.execute(text(f"ALTER INDEX IF EXISTS {index.name} RENAME TO {index.name}_unpartitioned"))
+
+        connection.execute(text(
+            f"CREATE TABLE {TABLE} (LIKE {legacy} INCLUDING DEFAULTS, "
+            f"CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, timestamp), "
+            f"CONSTRAINT {TABLE}_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id)) "
+            f"PARTITION BY RANGE (timestamp)"
+        ))
+        connection.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+
+        first = month_start(bounds[0]) if bounds[0] else month_start(datetime.utcnow())
+        last = add_months(month_start(datetime.utcnow()), months_ahead)
+        if bounds[1]:
+            last = max(last, month_start(bounds[1]))
+        month = first
+        while month <= last:
+            _create_partition(connection, month)
+            month = add_months(month, 1)
+
+        # The partition key is part of the primary key, so entries without a timestamp get one
+        connection.execute(text(
+            f"INSERT INTO {TABLE} (id, user_id, department, waste_type, amount, timestamp) "
+            f"SELECT id, user_id, department, waste_type, amount, COALESCE(timestamp, now() AT TIME ZONE 'utc') "
+            f"FROM {legacy}"
+        ))
+        sequence = connection.execute(text(f"SELECT pg_get_serial_sequence('{legacy}', 'id')")).scalar()
+        if sequence:
+            connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id"))
+        connection.execute(text(f"DROP TABLE {legacy}"))
+
+    # Declared indexes are created on the parent and cascade to every partition
+    ensure_indexes(engine, [WasteEntry.__table__])
+    return True
+
+def create_future_partitions(engine, months_ahead=3, today=None):
+    """Create partitions from the current month through months_ahead, and for any month
+    that has rows in the default partition; returns the months created.
+
+    PostgreSQL refuses to create a partition for a range the default partition holds
+    rows for, so when a month has overflowed into it (say partitions ran out while
+    nothing created them) the default is detached, the month's rows are moved into the
+    new partition and the default is attached again, all in one transaction. The
+    refresh worker calls this every PARTITION_CHECK_SECONDS.
+    """
+    if not is_partitioned(engine):
+        return []
+    existing = set(list_periods(engine))
+    current = month_start(today or datetime.utcnow())
+    months = {add_months(current, offset) for offset in range(months_ahead + 1)}
+
+    columns = "id, user_id, department, waste_type, amount, timestamp"
+    with engine.begin() as connection:
+        overflowed = set(connection.execute(text(
+            f"SELECT DISTINCT CAST(date_trunc('month', timestamp) AS date) FROM {DEFAULT_PARTITION}"
+        )).scalars().all())
+        created = sorted(month for month in months | overflowed if month not in existing)
+        if not created:
+            return []
+
+        if overflowed:
+            connection.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}"))
+        for month in created:
+            _create_partition(connection, month)
+        for month in sorted(overflowed):
+            bounds = {'start': month, 'end': add_months(month, 1)}
+            connection.execute(text(
+                f"INSERT INTO {TABLE} ({columns}) SELECT {columns} FROM {DEFAULT_PARTITION} "
+                f"WHERE timestamp >= :start AND timestamp < :end"
+            ), bounds)
+            connection.execute(text(
+                f"DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= :start AND timestamp < :end"
+            ), bounds)
+        if overflowed:
+            connection.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+    return created
+
+# SQLite
+
+def split_old_periods(engine, keep_months=12, today=None):
+    """Move whole months older than keep_months out of waste_entries into per-period tables (SQLite).
+
+    Returns the months moved. Period tables are read by archive_periods; the dashboard
+    reads totals from the rollup, which still covers the moved months.
+    """
+    if engine.dialect.name == 'postgresql':
+        raise RuntimeError("PostgreSQL partitions by month natively; use convert_to_partitioned")
+
+    cutoff = add_months(month_start(today or datetime.utcnow()), -keep_months)
+    with engine.begin() as connection:
+        first = connection.execute(
+            text(f"SELECT min(timestamp) FROM {TABLE} WHERE timestamp < :cutoff"), {'cutoff': cutoff.isoformat()}
+        ).scalar()
+        if first is None:
+            return []
+
+        moved = []
+        month = month_start(pd.Timestamp(first).date())
+        while month < cutoff:
+            bounds = {'start': month.isoformat(), 'end': add_months(month, 1).isoformat()}
+            name = period_table_name(month)
+            connection.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {name} AS SELECT * FROM {TABLE} WHERE 0"
+            ))
+            copied = connection.execute(text(
+                f"INSERT INTO {name} SELECT * FROM {TABLE} WHERE timestamp >= :start AND timestamp < :end"
+            ), bounds).rowcount
+            if copied:
+                connection.execute(text(
+                    f"DELETE FROM {TABLE} WHERE timestamp >= :start AND timestamp < :end"
+                ), bounds)
+                moved.append(month)
+            month = add_months(month, 1)
+    return moved
+
+# Both dialects
+
+def archive_periods(engine, before, archive_dir, compression='zstd'):
+    """Write every partition or period table that ends on or before `before` to Parquet and drop it.
+
+    Files are named waste_entries_YYYY_MM.parquet. Returns (month, rows) for each archived period.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Archiving requires pyarrow: pip install pyarrow")
+
+    os.makedirs(archive_dir, exist_ok=True)
+    postgres = engine.dialect.name == 'postgresql'
+    archived = []
+    for month in list_periods(engine):
+        if add_months(month, 1) > before:
+            continue
+        name = period_table_name(month)
+        path = os.path.join(archive_dir, f"{name}.parquet")
+
+        rows = 0
+        writer = None
+        with engine.connect() as connection:
+            for chunk in pd.read_sql(text(f"SELECT * FROM {name} ORDER BY id"), connection,
+                                     chunksize=ARCHIVE_CHUNK_ROWS):
+                batch = pa.Table.from_pandas(chunk, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path + '.tmp', batch.schema, compression=compression)
+                writer.write_table(batch.cast(writer.schema))
+                rows += len(chunk)
+        if writer is not None:
+            writer.close()
+            os.replace(path + '.tmp', path)
+
+        with engine.begin() as connection:
+            if postgres:
+                connection.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+            connection.execute(text(f"DROP TABLE {name}"))
+        archived.append((month, rows))
+    return archived
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('status', help="List partitions or period tables")
+    convert = commands.add_parser('convert', help="Convert waste_entries to a partitioned table (PostgreSQL)")
+    convert.add_argument('--months', type=int, default=3, help="Future months to create")
+    future = commands.add_parser('create-future', help="Create upcoming monthly partitions (PostgreSQL)")
+    future.add_argument('--months', type=int, default=3)
+    split = commands.add_parser('split', help="Move old months into per-period tables (SQLite)")
+    split.add_argument('--keep-months', type=int, default=12)
+    archive = commands.add_parser('archive', help="Archive old partitions to Parquet and drop them")
+    archive.add_argument('--before', required=True, type=date.fromisoformat,
+                         help="Archive months that end on or before this date (YYYY-MM-DD)")
+    archive.add_argument('--dir', default='archive')
+    archive.add_argument('--compression', default='zstd', choices=['zstd', 'snappy', 'gzip'])
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if args.command == 'status':
+        mode = "partitioned" if is_partitioned(engine) else f"{engine.dialect.name} (unpartitioned)"
+        periods = list_periods(engine)
+        print(f"{TABLE}: {mode}, {len(periods)} monthly partitions/period tables")
+        for month in periods:
+            print(f"  {period_table_name(month)}")
+    elif args.command == 'convert':
+        if convert_to_partitioned(engine, args.months):
+            print(f"✅ {TABLE} is now partitioned by month")
+        else:
+            print(f"{TABLE} is already partitioned")
+    elif args.command == 'create-future':
+        created = create_future_partitions(engine, args.months)
+        print(f"✅ Created {len(created)} partitions: {', '.join(period_table_name(m) for m in created) or 'none'}")
+    elif args.command == 'split':
+        moved = split_old_periods(engine, args.keep_months)
+        print(f"✅ Moved {len(moved)} months into period tables")
+    else:
+        for month, rows in archive_periods(engine, args.before, args.dir, args.compression):
+            print(f"✅ {period_table_name(month)}: {rows:,} rows archived to {args.dir}")
+
+if __name__ == "__main__":
+    main()
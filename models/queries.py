@@ -0,0 +1,127 @@
+import pandas as pd
+from datetime import datetime, timedelta
+from sqlalchemy import case, func
+from models.database import DepartmentTotal, WasteDailyRollup, WasteEntry, WASTE_TYPES
+
+# Length of each dashboard "Time Range" option
+TIME_RANGES = {
+    "Last Week": timedelta(days=7),
+    "Last Month": timedelta(days=30),
+    "Last Year": timedelta(days=365)
+}
+
+def get_time_window_start(time_range, now=None):
+    """Return the start of the selected time range, or None for an unbounded range."""
+    window = TIME_RANGES.get(time_range)
+    if window is None:
+        return None
+    return (now or datetime.utcnow()) - window
+
+# Sidebar label -> bucket size for get_waste_totals
+GRANULARITIES = {
+    "Hour": 'hour',
+    "Day": 'day',
+    "Week": 'week',
+    "Month": 'month'
+}
+
+# pandas frequency of each bucket size, for filling in buckets that have no entries
+BUCKET_FREQUENCIES = {
+    'hour': 'h',
+    'day': 'D',
+    'week': 'W-MON',
+    'month': 'MS'
+}
+
+def bucket_expression(column, granularity, dialect_name):
+    """SQL expression truncating a date or timestamp column to the start of its hour, day, week or month.
+
+    Weeks start on Monday. PostgreSQL uses date_trunc; SQLite uses its date functions.
+    """
+    if granularity not in GRANULARITIES.values():
+        raise ValueError(f"Unknown granularity: {granularity}")
+    if dialect_name == 'postgresql':
+        return func.date_trunc(granularity, column)
+    if dialect_name == 'sqlite':
+        if granularity == 'hour':
+            return func.strftime('%Y-%m-%d %H:00:00', column)
+        if granularity == 'week':
+            return func.date(column, '-6 days', 'weekday 1')
+        if granularity == 'month':
+            return func.date(column, 'start of month')
+        return func.date(column)
+    if granularity == 'day':
+        return func.date(column)
+    raise NotImplementedError(f"Time bucketing is not implemented for {dialect_name}")
+
+def get_waste_totals(session, granularity='day', department=None, start=None):
+    """Totals per waste type bucketed by hour, day, week or month, as a wide frame with a DatetimeIndex."""
+    return waste_totals_frame(waste_totals_query(session, granularity, department, start).all(), granularity)
+
+def get_daily_waste_totals(session, department=None, start=None):
+    """Daily totals per waste type from the rollup table, indexed by date with one column per waste type."""
+    return get_waste_totals(session, 'day', department, start)
+
+def waste_totals_query(session, granularity='day', department=None, start=None):
+    """Query of (bucket, <one total per waste type>) rows, pivoted in the database.
+
+    Day, week and month buckets are summed from the daily rollup; hourly buckets
+    need the individual entries.
+    """
+    if granularity == 'hour':
+        source, time_column, amount = WasteEntry, WasteEntry.timestamp, WasteEntry.amount
+    else:
+        source, time_column, amount = WasteDailyRollup, WasteDailyRollup.day, WasteDailyRollup.total_amount
+
+    bucket = bucket_expression(time_column, granularity, session.get_bind().dialect.name).label('bucket')
+    query = session.query(
+        bucket,
+        *[
+            func.sum(case((source.waste_type == waste_type, amount), else_=0.0)).label(waste_type)
+            for waste_type in WASTE_TYPES
+        ]
+    )
+
+    if department:
+        query = query.filter(source.department == department)
+
+    if start is not None:
+        query = query.filter(time_column >= (start if granularity == 'hour' else start.date()))
+
+    return query.group_by(bucket).order_by(bucket)
+
+def waste_totals_frame(results, granularity='day'):
+    """Turn (bucket, <total per waste type>) rows into a float frame indexed by bucket start.
+
+    The query only returns buckets that have entries; the ones between them are added
+    as zeros, so rows are evenly spaced from the first bucket to the last.
+    """
+    if not results:
+        return pd.DataFrame(columns=WASTE_TYPES)
+
+    wide_df = pd.DataFrame.from_records(results, columns=['date'] + WASTE_TYPES)
+    wide_df.index = pd.DatetimeIndex(pd.to_datetime(wide_df.pop('date')), name='date')
+    wide_df = wide_df.astype(float).sort_index()
+    buckets = pd.date_range(wide_df.index[0], wide_df.index[-1], freq=BUCKET_FREQUENCIES[granularity], name='date')
+    return wide_df.reindex(buckets, fill_value=0.0)
+
+def get_department_stats(session, department=None, start=None):
+    """(department, total amount, entry count) rows for one department (None for all) since start.
+
+    All-time figures are a primary-key lookup of the running department totals;
+    a time window sums the daily rollup from its first day.
+    """
+    if start is None:
+        query = session.query(DepartmentTotal.department, DepartmentTotal.total_amount, DepartmentTotal.entry_count)
+        if department:
+            query = query.filter(DepartmentTotal.department == department)
+        return query.order_by(DepartmentTotal.department).all()
+
+    query = session.query(
+        WasteDailyRollup.department,
+        func.sum(WasteDailyRollup.total_amount).label('total_amount'),
+        func.sum(WasteDailyRollup.entry_count).label('entry_count')
+    ).filter(WasteDailyRollup.day >= start.date())
+    if department:
+        query = query.filter(WasteDailyRollup.department == department)
+    return query.group_by(WasteDailyRollup.department).order_by(WasteDailyRollup.department).all()
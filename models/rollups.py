@@ -0,0 +1,299 @@
+from datetime import date, datetime, timedelta
+from sqlalchemy import case, delete, func, insert, select, text
+from models.database import DepartmentTotal, WasteEntry, WasteDailyRollup
+
+ROLLUP_KEY = ['department', 'day', 'waste_type']
+
+def rollup_deltas_from_entries(entries):
+    """Aggregate WasteEntry objects into rollup deltas keyed by department, day and waste type."""
+    deltas = {}
+    for entry in entries:
+        timestamp = entry.timestamp or datetime.utcnow()
+        key = (entry.department, timestamp.date(), entry.waste_type)
+        delta = deltas.get(key)
+        if delta is None:
+            deltas[key] = {
+                'department': key[0],
+                'day': key[1],
+                'waste_type': key[2],
+                'total_amount': entry.amount,
+                'entry_count': 1,
+                'min_amount': entry.amount,
+                'max_amount': entry.amount
+            }
+        else:
+            delta['total_amount'] += entry.amount
+            delta['entry_count'] += 1
+            delta['min_amount'] = min(delta['min_amount'], entry.amount)
+            delta['max_amount'] = max(delta['max_amount'], entry.amount)
+    return list(deltas.values())
+
+def rollup_deltas_from_frame(entries):
+    """Vectorised rollup deltas for a DataFrame of entries with department, waste_type, amount and timestamp."""
+    if entries.empty:
+        return []
+    grouped = entries.assign(day=entries['timestamp'].dt.date).groupby(
+        ['department', 'day', 'waste_type'], sort=False
+    )['amount'].agg(
+        total_amount='sum',
+        entry_count='count',
+        min_amount='min',
+        max_amount='max'
+    )
+    return grouped.reset_index().to_dict('records')
+
+def _upsert_statement(dialect_name):
+    """Build a dialect specific INSERT .. ON CONFLICT that folds a delta into an existing rollup row."""
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+
+    table = WasteDailyRollup.__table__
+    stmt = dialect_insert(table)
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=ROLLUP_KEY,
+        set_={
+            'total_amount': table.c.total_amount + excluded.total_amount,
+            'entry_count': table.c.entry_count + excluded.entry_count,
+            'min_amount': case(
+                (excluded.min_amount < table.c.min_amount, excluded.min_amount),
+                else_=table.c.min_amount
+            ),
+            'max_amount': case(
+                (excluded.max_amount > table.c.max_amount, excluded.max_amount),
+                else_=table.c.max_amount
+            )
+        }
+    )
+
+def department_deltas(deltas):
+    """Sum rollup deltas per department for the running department totals."""
+    totals = {}
+    for delta in deltas:
+        total = totals.setdefault(delta['department'], {
+            'department': delta['department'],
+            'total_amount': 0.0,
+            'entry_count': 0
+        })
+        total['total_amount'] += float(delta['total_amount'])
+        total['entry_count'] += int(delta['entry_count'])
+    return list(totals.values())
+
+def _department_upsert_statement(dialect_name):
+    """INSERT .. ON CONFLICT that adds a delta to a department's running totals."""
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+
+    table = DepartmentTotal.__table__
+    stmt = dialect_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=['department'],
+        set_={
+            'total_amount': table.c.total_amount + stmt.excluded.total_amount,
+            'entry_count': table.c.entry_count + stmt.excluded.entry_count
+        }
+    )
+
+def apply_department_deltas(connection, totals):
+    """Add per-department deltas to the running totals on the given connection."""
+    if not totals:
+        return
+
+    stmt = _department_upsert_statement(connection.dialect.name)
+    if stmt is not None:
+        connection.execute(stmt, totals)
+        return
+
+    table = DepartmentTotal.__table__
+    for total in totals:
+        updated = connection.execute(
+            table.update().where(table.c.department == total['department']).values(
+                total_amount=table.c.total_amount + total['total_amount'],
+                entry_count=table.c.entry_count + total['entry_count']
+            )
+        )
+        if updated.rowcount == 0:
+            connection.execute(insert(table), total)
+
+def apply_rollup_deltas(connection, deltas):
+    """Fold pre-aggregated deltas into the rollup table and department totals on the given connection."""
+    if not deltas:
+        return
+
+    apply_department_deltas(connection, department_deltas(deltas))
+
+    stmt = _upsert_statement(connection.dialect.name)
+    if stmt is not None:
+        connection.execute(stmt, deltas)
+        return
+
+    # Generic fallback for dialects without ON CONFLICT support
+    table = WasteDailyRollup.__table__
+    for delta in deltas:
+        row = connection.execute(
+            select(table).where(
+                table.c.department == delta['department'],
+                table.c.day == delta['day'],
+                table.c.waste_type == delta['waste_type']
+            )
+        ).first()
+        if row is None:
+            connection.execute(insert(table), delta)
+        else:
+            connection.execute(
+                table.update().where(table.c.id == row.id).values(
+                    total_amount=row.total_amount + delta['total_amount'],
+                    entry_count=row.entry_count + delta['entry_count'],
+                    min_amount=min(row.min_amount, delta['min_amount']),
+                    max_amount=max(row.max_amount, delta['max_amount'])
+                )
+            )
+
+def update_rollups_after_flush(session, flush_context):
+    """Session hook: add newly flushed waste entries to the daily rollup in the same transaction."""
+    new_entries = [obj for obj in session.new if isinstance(obj, WasteEntry)]
+    if new_entries:
+        apply_rollup_deltas(session.connection(), rollup_deltas_from_entries(new_entries))
+
+def rebuild_rollups(session):
+    """Recompute the rollup table from waste_entries (backfill or reconciliation), then the department totals.
+
+    Days before the earliest remaining entry are kept: their entries have been
+    archived (see models.partitioning) and only live on in the rollup.
+    """
+    table = WasteDailyRollup.__table__
+    earliest = session.query(func.min(WasteEntry.timestamp)).scalar()
+    day = func.date(WasteEntry.timestamp)
+    source = select(
+        WasteEntry.department,
+        day,
+        WasteEntry.waste_type,
+        func.sum(WasteEntry.amount),
+        func.count(WasteEntry.id),
+        func.min(WasteEntry.amount),
+        func.max(WasteEntry.amount)
+    ).where(WasteEntry.timestamp.isnot(None)).group_by(WasteEntry.department, day, WasteEntry.waste_type)
+
+    if earliest is None:
+        session.execute(delete(table))
+    else:
+        session.execute(delete(table).where(table.c.day >= earliest.date()))
+    session.execute(
+        insert(table).from_select(
+            ['department', 'day', 'waste_type', 'total_amount', 'entry_count', 'min_amount', 'max_amount'],
+            source
+        )
+    )
+    reconcile_department_totals(session)
+
+def _differs(a, b, tolerance):
+    return abs(a - b) > tolerance * max(abs(a), abs(b), 1.0)
+
+def reconcile_recent_rollups(connection, days=7, today=None, tolerance=1e-6):
+    """Correct the rollup and department totals for the last `days` days from waste_entries;
+    returns the departments fixed.
+
+    Writes that bypass the ORM hook and the ingest path (manual SQL, deleted entries)
+    change waste_entries without the rollup or the totals, so only the entries can show
+    the drift. Run it as a write on the given connection (through run_write on SQLite):
+    the rollup is locked first so no write commits between reading the entries and the
+    rollup. The days checked must still be in waste_entries, i.e. not yet archived.
+    """
+    first_day = (today or datetime.utcnow().date()) - timedelta(days=days - 1)
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text(f"LOCK TABLE {WasteDailyRollup.__tablename__} IN SHARE ROW EXCLUSIVE MODE"))
+    elif connection.dialect.name == 'sqlite' and not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+    day = func.date(WasteEntry.timestamp)
+    expected = {}
+    for department, entry_day, waste_type, total, count, low, high in connection.execute(
+        select(
+            WasteEntry.department, day, WasteEntry.waste_type, func.sum(WasteEntry.amount),
+            func.count(WasteEntry.id), func.min(WasteEntry.amount), func.max(WasteEntry.amount)
+        ).where(WasteEntry.timestamp >= datetime.combine(first_day, datetime.min.time()))
+        .group_by(WasteEntry.department, day, WasteEntry.waste_type)
+    ):
+        if not isinstance(entry_day, date):
+            entry_day = date.fromisoformat(entry_day)
+        expected[(department, entry_day, waste_type)] = (float(total), int(count), float(low), float(high))
+
+    table = WasteDailyRollup.__table__
+    actual = {
+        (row.department, row.day, row.waste_type): row
+        for row in connection.execute(select(table).where(table.c.day >= first_day))
+    }
+
+    totals = {}
+    for key in set(expected) | set(actual):
+        row = actual.get(key)
+        total, count, low, high = expected.get(key, (0.0, 0, None, None))
+        if row is not None and row.entry_count == count and not _differs(row.total_amount, total, tolerance) \
+                and (count == 0 or (row.min_amount == low and row.max_amount == high)):
+            continue
+        if row is None:
+            connection.execute(insert(table).values(
+                department=key[0], day=key[1], waste_type=key[2],
+                total_amount=total, entry_count=count, min_amount=low, max_amount=high
+            ))
+        elif count == 0:
+            connection.execute(delete(table).where(table.c.id == row.id))
+        else:
+            connection.execute(table.update().where(table.c.id == row.id).values(
+                total_amount=total, entry_count=count, min_amount=low, max_amount=high
+            ))
+        delta = totals.setdefault(key[0], {'department': key[0], 'total_amount': 0.0, 'entry_count': 0})
+        delta['total_amount'] += total - (row.total_amount if row is not None else 0.0)
+        delta['entry_count'] += count - (row.entry_count if row is not None else 0)
+
+    apply_department_deltas(connection, list(totals.values()))
+    return sorted(totals)
+
+def reconcile_department_totals(session, tolerance=1e-6):
+    """Correct running department totals that drifted from the rollup table; returns the departments fixed.
+
+    The two are written in the same transaction, so they only part when one is changed
+    on its own (a rollup rebuild or hand edit). Drift between waste_entries and both of
+    them is reconcile_recent_rollups' job. Summing the rollup is O(departments x days),
+    not O(entries).
+    """
+    rollup = WasteDailyRollup.__table__
+    table = DepartmentTotal.__table__
+    expected = {
+        department: (float(total or 0.0), int(count or 0))
+        for department, total, count in session.execute(
+            select(rollup.c.department, func.sum(rollup.c.total_amount), func.sum(rollup.c.entry_count))
+            .group_by(rollup.c.department)
+        )
+    }
+    actual = {
+        department: (total, count)
+        for department, total, count in session.execute(
+            select(table.c.department, table.c.total_amount, table.c.entry_count)
+        )
+    }
+
+    fixed = []
+    for department in set(expected) | set(actual):
+        total, count = expected.get(department, (0.0, 0))
+        current = actual.get(department)
+        if current is None:
+            session.execute(insert(table).values(department=department, total_amount=total, entry_count=count))
+        elif _differs(current[0], total, tolerance) or current[1] != count:
+            session.execute(
+                table.update().where(table.c.department == department).values(total_amount=total, entry_count=count)
+            )
+        else:
+            continue
+        fixed.append(department)
+
+    session.commit()
+    return fixed
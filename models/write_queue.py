@@ -0,0 +1,109 @@
+"""Single-writer queue for SQLite.
+
+SQLite allows one writer per database file. Dashboard sessions, file imports and
+the ingestion API all write from their own threads, and on SQLite those writers
+would otherwise queue up on the busy timeout or fail with "database is locked".
+run_write sends every write for a SQLite engine through one thread per database;
+other databases handle concurrent writers themselves and write on the calling thread.
+"""
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from models.database import get_engine
+
+# Writes waiting in the queue together are committed as one transaction, up to this many
+WRITE_QUEUE_BATCH = int(os.getenv('WRITE_QUEUE_BATCH', '64'))
+
+class WriteQueue:
+    """Runs write transactions for one engine, one at a time, on a dedicated thread.
+
+    Work is a callable taking a connection inside an open transaction. Writes that
+    arrive while another is committing share the next transaction, so a burst of
+    single-entry inserts costs one WAL commit. If a shared transaction fails every
+    write in it is retried on its own, so only the failing write reports the error;
+    work must therefore only touch the database through the connection it is given.
+    """
+
+    def __init__(self, engine, max_batch=WRITE_QUEUE_BATCH):
+        self.engine = engine
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self.writes = 0
+        self.transactions = 0
+        self.failed = 0
+        self._thread = threading.Thread(target=self._run, name='sqlite-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, work):
+        """Queue work(connection); returns a Future with its result."""
+        future = Future()
+        self._queue.put((work, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write([(work, future) for work, future in batch if future.set_running_or_notify_cancel()])
+
+    def _write(self, batch):
+        if len(batch) > 1:
+            try:
+                with self.engine.begin() as connection:
+                    results = [work(connection) for work, _ in batch]
+            except Exception:
+                pass
+            else:
+                self.transactions += 1
+                self.writes += len(batch)
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+                return
+
+        for work, future in batch:
+            try:
+                with self.engine.begin() as connection:
+                    result = work(connection)
+            except Exception as e:
+                self.failed += 1
+                future.set_exception(e)
+            else:
+                self.transactions += 1
+                self.writes += 1
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            'pending': self._queue.qsize(),
+            'writes': self.writes,
+            'transactions': self.transactions,
+            'failed': self.failed
+        }
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+def get_write_queue(engine):
+    """The writer for a SQLite engine, started on first use."""
+    with _queues_lock:
+        if engine not in _queues:
+            _queues[engine] = WriteQueue(engine)
+        return _queues[engine]
+
+def run_write(work, engine=None):
+    """Run work(connection) inside a write transaction and return its result.
+
+    On SQLite this waits for the database's writer thread; elsewhere the
+    transaction runs on the calling thread.
+    """
+    engine = engine or get_engine()
+    if engine.dialect.name != 'sqlite':
+        with engine.begin() as connection:
+            return work(connection)
+    return get_write_queue(engine).submit(work).result()
@@ -1,7 +1,14 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from auth.auth_handler import get_all_users, create_user, delete_user, DEPARTMENTS
+from auth.password_service import get_password_service
+from auth.rate_limiter import get_login_limiter
+from auth.user_cache import invalidate_user
 from models.database import User, get_session
+from utils.dashboard_data import figure_cache, query_cache
+from utils.refresh_worker import get_refresh_worker
+from utils.tracing import clear_traces, recent_traces
 
 def show_admin_panel():
     st.title("👑 Admin Panel")
@@ -10,13 +17,13 @@ def show_admin_panel():
         st.error("You don't have permission to access this page.")
         return
     
-    tabs = st.tabs(["User Management", "System Settings"])
+    tabs = st.tabs(["User Management", "Performance"])
     
     with tabs[0]:
         show_user_management()
     
     with tabs[1]:
-        show_system_settings()
+        show_performance()
 
 def show_user_management():
     st.header("User Management")
@@ -108,6 +115,7 @@ def show_user_management():
                         user.department = edit_department
                         user.job_title = edit_job_title
                         session.commit()
+                        invalidate_user(user.id)
                         st.success("User updated successfully!")
                         del st.session_state['user_to_edit']
                         st.rerun()
@@ -145,9 +153,137 @@ def show_user_management():
             del st.session_state['user_to_reset_password']
             st.rerun()
 
-def show_system_settings():
-    st.header("System Settings")
-    st.info("System settings will be implemented in future updates.")
+def show_performance():
+    st.header("Performance")
+
+    traces = recent_traces("dashboard")
+    st.subheader("Dashboard Reruns")
+    if not traces:
+        st.info("No dashboard reruns recorded since the server started.")
+    else:
+        totals = [trace.total_ms for trace in traces]
+        p50, p90, p99 = np.percentile(totals, [50, 90, 99])
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Reruns", len(traces))
+        col2.metric("p50", f"{p50:.0f} ms")
+        col3.metric("p90", f"{p90:.0f} ms")
+        col4.metric("p99", f"{p99:.0f} ms")
+
+        # Exclusive time per category: SQL, pandas, forecasting, Plotly and data loading
+        categories = pd.DataFrame([trace.category_ms() for trace in traces]).fillna(0.0)
+        st.markdown("**Where the time goes** (exclusive ms per rerun)")
+        st.dataframe(pd.DataFrame({
+            "Mean (ms)": categories.mean(),
+            "p90 (ms)": categories.quantile(0.9),
+            "Share": (categories.sum() / categories.sum().sum()).map("{:.0%}".format)
+        }).sort_values("Mean (ms)", ascending=False).round(1), use_container_width=True)
+
+        stages = pd.DataFrame([
+            {"Stage": stage.name, "Category": stage.category, "ms": stage.ms}
+            for trace in traces for stage in trace.spans
+        ])
+        if not stages.empty:
+            st.markdown("**Stages** (inclusive ms)")
+            summary = stages.groupby(["Stage", "Category"])["ms"].agg(
+                Calls="count",
+                p50=lambda ms: ms.quantile(0.5),
+                p90=lambda ms: ms.quantile(0.9),
+                Max="max"
+            ).sort_values("p50", ascending=False).round(1)
+            st.dataframe(summary, use_container_width=True)
+
+        st.markdown("**Recent reruns**")
+        st.dataframe(pd.DataFrame([{
+            "Started": trace.started_at.strftime("%H:%M:%S"),
+            "Total (ms)": round(trace.total_ms, 1),
+            "SQL (ms)": round(trace.sql_ms, 1),
+            "Statements": trace.sql_statements,
+            "Rows": trace.sql_rows
+        } for trace in reversed(traces[-20:])]), use_container_width=True, hide_index=True)
+
+        queries = pd.DataFrame(
+            [query for trace in traces for query in trace.queries],
+            columns=["Statement", "ms", "Rows"]
+        )
+        if not queries.empty:
+            st.markdown("**Slowest SQL**")
+            slowest = queries.groupby("Statement")["ms"].agg(Calls="count", Mean="mean", Max="max")
+            st.dataframe(slowest.sort_values("Max", ascending=False).head(10).round(2), use_container_width=True)
+            st.caption("Row counts come from the driver: PostgreSQL reports rows returned, SQLite only rows changed.")
+
+        if st.button("Clear Timings"):
+            clear_traces()
+            st.rerun()
+
+    st.subheader("Background Refresh")
+    worker = get_refresh_worker()
+    if worker is None:
+        st.info("The refresh worker is not running (it starts with the first dashboard load unless REFRESH_WORKER=false).")
+    else:
+        stats = worker.stats()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Status", "Running" if stats['alive'] else "Stopped")
+        col2.metric("Precomputed Views", stats['states'])
+        col3.metric("Last Refresh", f"{stats['last_cycle_seconds']:.2f} s")
+        col4.metric("Errors", stats['errors'])
+        st.caption(
+            f"{stats['refreshed']} views refreshed over {stats['cycles']} checks · oldest view computed "
+            f"{stats['oldest_state']:%H:%M:%S} UTC" if stats['oldest_state'] else "No views computed yet"
+        )
+        if stats['reconciled_departments']:
+            st.caption(f"{stats['reconciled_departments']} drifted department totals corrected by reconciliation")
+        if stats['partitions_created']:
+            st.caption(f"{stats['partitions_created']} monthly partitions created")
+        if stats['last_error']:
+            st.warning(f"Last refresh error: {stats['last_error']}")
+
+    st.subheader("Dashboard Query Cache")
+    stats = query_cache.stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Hits", stats['hits'])
+    col2.metric("Misses", stats['misses'])
+    col3.metric("Hit Rate", f"{stats['hit_rate'] * 100:.1f}%")
+    col4.metric("Entries", f"{stats['entries']} / {stats['max_entries']}")
+    st.caption(
+        f"TTL {stats['ttl_seconds']}s · {stats['evictions']} evictions · "
+        f"{stats['invalidations']} invalidated by new entries"
+    )
+
+    if st.button("Clear Query Cache"):
+        query_cache.clear()
+        st.rerun()
+
+    st.subheader("Chart Figure Cache")
+    stats = figure_cache.stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Hits", stats['hits'])
+    col2.metric("Misses", stats['misses'])
+    col3.metric("Hit Rate", f"{stats['hit_rate'] * 100:.1f}%")
+    col4.metric("Figures", f"{stats['entries']} / {stats['max_entries']}")
+
+    if st.button("Clear Figure Cache"):
+        figure_cache.clear()
+        st.rerun()
+
+    st.subheader("Sign-in Protection")
+    stats = get_login_limiter().stats()
+    hashing = get_password_service().stats()
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Attempts Allowed", stats['allowed'])
+    col2.metric("Throttled (account)", stats['rejected_users'])
+    col3.metric("Throttled (client)", stats['rejected_clients'])
+    col4.metric("Busy Rejections", hashing['rejected'])
+    st.caption(
+        f"Tracking {stats['tracked_users']} usernames and {stats['tracked_clients']} clients "
+        f"(max {stats['max_keys']} each, {stats['evictions']} forgotten) · bcrypt cost {hashing['rounds']} on "
+        f"{hashing['workers']} workers · {hashing['verifications']} verifications, {hashing['rehashes']} rehashed"
+    )
+    if not stats['enabled']:
+        st.warning("Sign-in rate limiting is disabled.")
+
+    if st.button("Reset Sign-in Limits"):
+        get_login_limiter().clear()
+        st.rerun()
 
 if __name__ == "__main__":
     show_admin_panel()
\ No newline at end of file
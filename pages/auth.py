@@ -1,6 +1,18 @@
 import streamlit as st
 from auth.auth_handler import create_user, authenticate_user, get_job_titles, DEPARTMENTS
-import bcrypt
+from auth.password_service import PasswordServiceBusy
+from auth.rate_limiter import LoginThrottled
+from auth.user_cache import snapshot_user
+
+def client_id():
+    """Who is signing in, for the per-client attempt limit: the remote address, else the browser session."""
+    # st.context.ip_address arrived in Streamlit 1.45; older releases fall back to the session
+    ip_address = getattr(st.context, 'ip_address', None)
+    if ip_address:
+        return ip_address
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx else None
 
 def show_login_page():
     st.title("🔐 Login to Waste Management Dashboard")
@@ -27,7 +39,11 @@ def show_login_page():
                 st.error("Please enter both username and password")
             else:
                 # First authentication step
-                auth_result = authenticate_user(username, password)
+                try:
+                    auth_result = authenticate_user(username, password, client=client_id())
+                except (LoginThrottled, PasswordServiceBusy) as e:
+                    st.error(str(e))
+                    return
 
                 if auth_result == "2FA_REQUIRED":
                     # Store username for 2FA step
@@ -36,7 +52,7 @@ def show_login_page():
                     st.session_state['2fa_password'] = password
                     st.rerun()
                 elif auth_result:
-                    st.session_state['user'] = auth_result
+                    st.session_state['user'] = snapshot_user(auth_result)
                     st.session_state['authenticated'] = True
                     st.success("Successfully logged in!")
                     st.rerun()
@@ -58,11 +74,15 @@ def show_2fa_verification():
                 username = st.session_state['2fa_username']
                 password = st.session_state['2fa_password']
 
-                user = authenticate_user(username, password, verification_code)
+                try:
+                    user = authenticate_user(username, password, verification_code, client=client_id())
+                except (LoginThrottled, PasswordServiceBusy) as e:
+                    st.error(str(e))
+                    return
 
                 if user and user != "2FA_REQUIRED":
                     # Authentication successful
-                    st.session_state['user'] = user
+                    st.session_state['user'] = snapshot_user(user)
                     st.session_state['authenticated'] = True
 
                     # Clean up session
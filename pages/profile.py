@@ -3,8 +3,8 @@ import streamlit as st
 import qrcode
 import io
 import base64
-from auth.auth_handler import update_user, generate_2fa_qrcode, verify_2fa_setup, disable_2fa, DEPARTMENTS
-from models.database import User, get_session
+from auth.auth_handler import change_password, update_user, generate_2fa_qrcode, verify_2fa_setup, disable_2fa, DEPARTMENTS
+from auth.user_cache import get_user_snapshot
 
 def show_profile_page():
     if not st.session_state.get('authenticated') or not st.session_state.get('user'):
@@ -50,10 +50,8 @@ def show_profile_information(user):
             
             if success:
                 st.success(message)
-                # Update session user
-                session = get_session()
-                updated_user = session.query(User).get(user.id)
-                st.session_state['user'] = updated_user
+                # update_user dropped the cached snapshot, so this reads the new details
+                st.session_state['user'] = get_user_snapshot(user.id)
                 st.rerun()
             else:
                 st.error(message)
@@ -90,10 +88,7 @@ def show_security_settings(user):
             success, message = disable_2fa(user.id)
             if success:
                 st.success(message)
-                # Update session user
-                session = get_session()
-                updated_user = session.query(User).get(user.id)
-                st.session_state['user'] = updated_user
+                st.session_state['user'] = get_user_snapshot(user.id)
                 st.rerun()
             else:
                 st.error(message)
@@ -130,10 +125,7 @@ def show_security_settings(user):
                             success, message = verify_2fa_setup(user.id, verification_code)
                             if success:
                                 st.success(message)
-                                # Update session user
-                                session = get_session()
-                                updated_user = session.query(User).get(user.id)
-                                st.session_state['user'] = updated_user
+                                st.session_state['user'] = get_user_snapshot(user.id)
                                 del st.session_state['setup_2fa']
                                 st.rerun()
                             else:
@@ -163,18 +155,11 @@ def show_security_settings(user):
             elif new_password != confirm_password:
                 st.error("New passwords do not match")
             else:
-                from auth.auth_handler import check_password, hash_password
-                
-                # Verify current password
-                if check_password(user.password, current_password):
-                    # Update password
-                    session = get_session()
-                    user_obj = session.query(User).get(user.id)
-                    user_obj.password = hash_password(new_password)
-                    session.commit()
-                    st.success("Password changed successfully")
+                success, message = change_password(user.id, current_password, new_password)
+                if success:
+                    st.success(message)
                 else:
-                    st.error("Current password is incorrect")
+                    st.error(message)
 
 if __name__ == "__main__":
     show_profile_page()
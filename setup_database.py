@@ -1,6 +1,6 @@
-
 from dotenv import load_dotenv
-from models.database import Base, init_db
+from models.database import Base, init_db, get_session
+from models.rollups import rebuild_rollups
 import os
 
 def setup_database():
@@ -8,38 +8,16 @@ def setup_database():
     try:
         # Load environment variables
         load_dotenv()
-        
+
         # Initialize database
         engine = init_db()
-        
-        print("✅ Database initialized successfully!")
-        print(f"Connected to: {os.getenv('PGDATABASE')} at {os.getenv('PGHOST')}")
-        
-        return True
-    except Exception as e:
-        print("❌ Error initializing database:")
-        print(str(e))
-        return False
 
-if __name__ == "__main__":
-    setup_database()
+        # Backfill the daily rollup table from existing waste entries
+        rebuild_rollups(get_session())
 
-from dotenv import load_dotenv
-from models.database import Base, init_db
-import os
-
-def setup_database():
-    """Initialize the database and create all tables."""
-    try:
-        # Load environment variables
-        load_dotenv()
-        
-        # Initialize database
-        engine = init_db()
-        
         print("✅ Database initialized successfully!")
-        print(f"Connected to database")
-        
+        print(f"Connected to: {engine.url.render_as_string(hide_password=True)}")
+
         return True
     except Exception as e:
         print("❌ Error initializing database:")
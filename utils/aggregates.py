@@ -0,0 +1,36 @@
+import pandas as pd
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+class WasteAggregates:
+    """Monthly, weekday and overall rollups of a daily waste frame, computed once per data version.
+
+    Every chart and insight builder reads from the same bundle so a rerun does the
+    pandas work once. Instances are shared through the query cache and must not be
+    modified in place.
+    """
+
+    def __init__(self, daily, monthly_totals, monthly_means, weekday_means, totals):
+        self.daily = daily
+        self.monthly_totals = monthly_totals
+        self.monthly_means = monthly_means
+        self.weekday_means = weekday_means
+        self.totals = totals
+
+def compute_aggregates(historical_data):
+    """Build a WasteAggregates bundle from a date-indexed frame with one column per waste type."""
+    # Sums and counts per bucket give both totals and means without a second resample or groupby
+    monthly = historical_data.resample('ME')
+    monthly_totals = monthly.sum()
+    monthly_means = monthly_totals / monthly.count()
+
+    weekday = historical_data.groupby(historical_data.index.dayofweek)
+    weekday_means = weekday.sum() / weekday.count()
+
+    return WasteAggregates(
+        daily=historical_data,
+        monthly_totals=monthly_totals,
+        monthly_means=monthly_means,
+        weekday_means=weekday_means,
+        totals=monthly_totals.sum()
+    )
@@ -0,0 +1,90 @@
+import os
+import threading
+from models.database import get_session
+from models.queries import get_department_stats, get_time_window_start, get_waste_totals
+from utils.aggregates import compute_aggregates
+from utils.cache import QueryCache
+
+# Shared by every dashboard session in this server process
+query_cache = QueryCache(
+    max_entries=int(os.getenv('QUERY_CACHE_SIZE', '128')),
+    ttl_seconds=int(os.getenv('QUERY_CACHE_TTL', '300'))
+)
+
+# Built Plotly figures, keyed by chart, department, data version and the filters that shape them
+figure_cache = QueryCache(
+    max_entries=int(os.getenv('FIGURE_CACHE_SIZE', '64')),
+    ttl_seconds=int(os.getenv('FIGURE_CACHE_TTL', '600'))
+)
+
+# Bumped whenever a department's data changes; None counts changes to any department
+_data_versions = {}
+_versions_lock = threading.Lock()
+
+def data_version(department=None):
+    """Current version of a department's data (None for all departments)."""
+    with _versions_lock:
+        return _data_versions.get(department, 0)
+
+def load_waste_history(department, time_range, granularity='day'):
+    """Waste totals for a department (None for all) and time range, bucketed by hour, day, week
+    or month, served from the cache.
+
+    The returned DataFrame is shared between sessions and must not be modified in place.
+    """
+    def compute():
+        return get_waste_totals(
+            get_session(),
+            granularity,
+            department=department,
+            start=get_time_window_start(time_range)
+        )
+
+    key = ('waste_history', department, time_range)
+    if granularity != 'day':
+        key += (granularity,)
+    return query_cache.get_or_compute(key, compute)
+
+def load_waste_aggregates(department, time_range):
+    """Monthly, weekday and overall rollups of load_waste_history, computed once per data version."""
+    key = ('waste_aggregates', department, time_range, data_version(department))
+    return query_cache.get_or_compute(
+        key,
+        lambda: compute_aggregates(load_waste_history(department, time_range))
+    )
+
+def load_department_stats(department=None, time_range=None):
+    """Per-department totals and entry counts for a department (None for all) and time range
+    (None for all time), served from the cache."""
+    def compute():
+        return get_department_stats(
+            get_session(),
+            department=department,
+            start=get_time_window_start(time_range)
+        )
+
+    return query_cache.get_or_compute(('department_stats', department, time_range), compute)
+
+def cached_figure(name, department, params, build):
+    """Return the figure build() makes for a chart of a department's data (None for all) and filters.
+
+    params must be hashable. Figures are shared between sessions and must not be modified.
+    """
+    key = (name, department, data_version(department)) + tuple(params)
+    return figure_cache.get_or_compute(key, build)
+
+def invalidate_departments(departments):
+    """Bump the data version of the given departments and drop cached results that include their data."""
+    departments = set(departments)
+    with _versions_lock:
+        for department in departments | {None}:
+            _data_versions[department] = _data_versions.get(department, 0) + 1
+
+    def affected(key):
+        if key[0] in ('waste_history', 'waste_aggregates', 'department_stats'):
+            return key[1] is None or key[1] in departments
+        return False
+
+    # Figures of older data versions can no longer be hit; drop them rather than wait for eviction
+    figure_cache.invalidate(lambda key: key[1] is None or key[1] in departments)
+    return query_cache.invalidate(affected)
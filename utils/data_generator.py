@@ -1,91 +1,142 @@
+import argparse
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 
-def generate_historical_data(date_range):
-    """Generate mock historical data for waste collection."""
-    
-    # Set date range
-    end_date = datetime.now()
-    if date_range == "Last Week":
-        start_date = end_date - timedelta(days=7)
-        freq = 'H'
-    elif date_range == "Last Month":
-        start_date = end_date - timedelta(days=30)
-        freq = '6H'
-    else:  # Last Year
-        start_date = end_date - timedelta(days=365)
-        freq = 'D'
-
-    # Generate date range
-    dates = pd.date_range(start=start_date, end=end_date, freq=freq)
-    
-    # Create base data with seasonal patterns
-    data = {
-        'Date': dates,
-        'Paper': np.random.normal(loc=20, scale=5, size=len(dates)),
-        'Plastic': np.random.normal(loc=15, scale=3, size=len(dates)),
-        'PET': np.random.normal(loc=10, scale=2, size=len(dates)),
-        'Toxic': np.random.normal(loc=5, scale=1, size=len(dates))
-    }
-    
-    # Add weekly patterns
-    for waste_type in ['Paper', 'Plastic', 'PET', 'Toxic']:
-        data[waste_type] *= 1 + 0.3 * np.sin(2 * np.pi * dates.dayofweek / 7)
-        # Ensure no negative values
-        data[waste_type] = np.maximum(data[waste_type], 0)
-    
-    df = pd.DataFrame(data)
-    df.set_index('Date', inplace=True)
-    
-    return df
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
+# Mean and standard deviation (kg) of a day's collection per waste type
+DAILY_PROFILE = {
+    'Paper': (15, 3),
+    'Plastic': (10, 2),
+    'PET': (8, 1.5),
+    'Toxic': (5, 1)
+}
+
+# Weekend drop in paper and increase in plastic
+WEEKEND_FACTORS = {'Paper': 0.7, 'Plastic': 1.3, 'PET': 1.0, 'Toxic': 1.0}
+
+TIME_RANGE_DAYS = {"Last Week": 7, "Last Month": 30, "Last Year": 365}
+
+def _weekend_factors(day_of_week, waste_types):
+    """(days x types) multipliers applying WEEKEND_FACTORS on Saturdays and Sundays."""
+    weekend = np.isin(np.asarray(day_of_week), [5, 6])[:, None]
+    factors = np.array([WEEKEND_FACTORS.get(wt, 1.0) for wt in waste_types])
+    return np.where(weekend, factors, 1.0)
+
+def _seasonal_factor(day_of_year):
+    """More waste in summer months."""
+    return 1 + 0.3 * np.sin(2 * np.pi * (np.asarray(day_of_year) / 365))
 
-def generate_historical_data(time_range="Last Month"):
-    """Generate sample historical data for waste types."""
-    
-    # Set date range based on selection
+def generate_historical_data(time_range="Last Month", seed=None):
+    """Generate sample daily totals per waste type for the dashboard's time range."""
     end_date = datetime.now()
-    if time_range == "Last Week":
-        start_date = end_date - timedelta(days=7)
-    elif time_range == "Last Month":
-        start_date = end_date - timedelta(days=30)
-    else:  # Last Year
-        start_date = end_date - timedelta(days=365)
-    
-    # Generate date range
+    start_date = end_date - timedelta(days=TIME_RANGE_DAYS.get(time_range, 365))
     date_range = pd.date_range(start=start_date, end=end_date, freq='D')
-    
-    # Create waste patterns with some randomness
-    data = {
-        'Paper': np.random.normal(15, 3, len(date_range)),  # Mean 15kg, std 3kg
-        'Plastic': np.random.normal(10, 2, len(date_range)),  # Mean 10kg, std 2kg
-        'PET': np.random.normal(8, 1.5, len(date_range)),    # Mean 8kg, std 1.5kg
-        'Toxic': np.random.normal(5, 1, len(date_range))     # Mean 5kg, std 1kg
-    }
-    
-    # Add weekly patterns
-    for i, date in enumerate(date_range):
-        # Weekend drop in paper and increase in plastic
-        if date.dayofweek in [5, 6]:  # Saturday and Sunday
-            data['Paper'][i] *= 0.7
-            data['Plastic'][i] *= 1.3
-        
-        # Ensure no negative values
-        for waste_type in data:
-            data[waste_type][i] = max(0.1, data[waste_type][i])
-    
-    # Create DataFrame
-    df = pd.DataFrame(data, index=date_range)
-    
+
+    rng = np.random.default_rng(seed)
+    waste_types = list(DAILY_PROFILE)
+    means = np.array([DAILY_PROFILE[wt][0] for wt in waste_types])
+    stds = np.array([DAILY_PROFILE[wt][1] for wt in waste_types])
+
+    values = rng.normal(means, stds, (len(date_range), len(waste_types)))
+    values *= _weekend_factors(date_range.dayofweek, waste_types)
+    values = np.maximum(values, 0.1)
+
     # Add seasonality for longer time periods
     if time_range == "Last Year":
-        # Add seasonality - more waste in summer months
-        for i, date in enumerate(date_range):
-            seasonal_factor = 1 + 0.3 * np.sin(2 * np.pi * (date.dayofyear / 365))
-            for waste_type in data:
-                df.loc[date, waste_type] *= seasonal_factor
-    
-    return df
+        values *= _seasonal_factor(date_range.dayofyear)[:, None]
+
+    return pd.DataFrame(values, index=date_range, columns=waste_types)
+
+def generate_waste_entries(start, end, departments, entries_per_day=100, user_ids=None, seed=None, days_per_chunk=7):
+    """Yield DataFrames of synthetic per-entry readings between start and end.
+
+    Columns are user_id, department, waste_type, amount and timestamp. Entry counts
+    per day are Poisson distributed around entries_per_day and follow the same
+    weekend and seasonal patterns as generate_historical_data. user_ids optionally
+    maps a department to the user ids to attribute its entries to. The output is
+    reproducible for a given seed and days_per_chunk.
+    """
+    departments = list(departments)
+    waste_types = list(DAILY_PROFILE)
+    means = np.array([DAILY_PROFILE[wt][0] for wt in waste_types])
+    stds = np.array([DAILY_PROFILE[wt][1] for wt in waste_types])
+    type_weights = means / means.sum()
+
+    days = pd.date_range(start=pd.Timestamp(start).normalize(), end=pd.Timestamp(end).normalize(), freq='D')
+    for chunk_index, offset in enumerate(range(0, len(days), days_per_chunk)):
+        rng = np.random.default_rng(None if seed is None else [seed, chunk_index])
+        chunk_days = days[offset:offset + days_per_chunk]
+        weekend = _weekend_factors(chunk_days.dayofweek, waste_types)
+        seasonal = _seasonal_factor(chunk_days.dayofyear)
+
+        counts = rng.poisson(entries_per_day * seasonal)
+        total = int(counts.sum())
+        if total == 0:
+            continue
+        day_index = np.repeat(np.arange(len(chunk_days)), counts)
+
+        # Weekend factors shift the mix of waste types as well as the amounts
+        type_probs = type_weights * weekend
+        type_probs /= type_probs.sum(axis=1, keepdims=True)
+        cumulative = type_probs.cumsum(axis=1)[day_index]
+        type_index = (rng.random(total)[:, None] > cumulative).sum(axis=1).clip(max=len(waste_types) - 1)
+
+        # Individual entries are a fraction of the daily profile for their type
+        scale = (weekend * seasonal[:, None])[day_index, type_index]
+        amounts = rng.normal(means[type_index], stds[type_index]) * scale / 4
+        amounts = np.round(np.maximum(amounts, 0.1), 2)
+
+        department_index = rng.integers(0, len(departments), total)
+        timestamps = chunk_days[day_index] + pd.to_timedelta(rng.integers(0, 86400, total), unit='s')
+
+        department_names = np.array(departments, dtype=object)[department_index]
+        entries = pd.DataFrame({
+            'user_id': pd.array([None] * total, dtype='Int64'),
+            'department': department_names,
+            'waste_type': np.array(waste_types, dtype=object)[type_index],
+            'amount': amounts,
+            'timestamp': timestamps
+        })
+
+        if user_ids:
+            for department, ids in user_ids.items():
+                mask = department_names == department
+                if ids and mask.any():
+                    entries.loc[mask, 'user_id'] = rng.choice(np.asarray(ids), int(mask.sum()))
+
+        in_range = (entries['timestamp'] >= pd.Timestamp(start)) & (entries['timestamp'] <= pd.Timestamp(end))
+        yield entries[in_range].reset_index(drop=True)
+
+def main():
+    from auth.auth_handler import DEPARTMENTS
+    from models.database import User, get_session
+    from utils.ingest import ingest_chunks
+
+    parser = argparse.ArgumentParser(description="Stream synthetic waste entries into the database for load testing.")
+    parser.add_argument('--days', type=int, default=365, help="Days of history ending today")
+    parser.add_argument('--entries-per-day', type=int, default=1000)
+    parser.add_argument('--departments', nargs='+', default=DEPARTMENTS)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--days-per-chunk', type=int, default=7)
+    args = parser.parse_args()
+
+    # Attribute entries to existing users of each department where there are any
+    user_ids = {}
+    for user_id, department in get_session().query(User.id, User.department):
+        user_ids.setdefault(department, []).append(user_id)
+
+    end = datetime.utcnow()
+    chunks = generate_waste_entries(
+        end - timedelta(days=args.days), end, args.departments,
+        entries_per_day=args.entries_per_day, user_ids=user_ids,
+        seed=args.seed, days_per_chunk=args.days_per_chunk
+    )
+
+    def progress(report):
+        print(f"  {report.rows_written:,} rows written, {report.rows_per_second:,.0f} rows/sec", end='\r')
+
+    report = ingest_chunks(chunks, progress=progress)
+    print(f"\n✅ {report.summary()}")
+
+if __name__ == "__main__":
+    main()
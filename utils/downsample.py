@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Plot width the dashboard's wide column is laid out for; one point per pixel is as much as a line can show
+CHART_WIDTH_PX = int(os.getenv('CHART_WIDTH_PX', '1000'))
+# Average LTTB bucket size above which one numpy call per bucket beats looping over its points
+LTTB_VECTOR_BUCKET_POINTS = 32
+
+def points_for_width(width_px=None, points_per_pixel=1.0):
+    """Number of points worth sending for a trace drawn width_px pixels wide."""
+    return max(int((width_px or CHART_WIDTH_PX) * points_per_pixel), 3)
+
+def lttb_indices(x, y, threshold):
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points that keep the shape of (x, y).
+
+    The first and last points are always kept; every bucket in between contributes the
+    point forming the largest triangle with the previous pick and the next bucket's mean.
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+
+    # Mean of the bucket after each bucket (the last one is followed by the final point)
+    counts = np.diff(np.append(edges, n))
+    next_x = (np.add.reduceat(x, edges) / counts)[1:].tolist()
+    next_y = (np.add.reduceat(y, edges) / counts)[1:].tolist()
+
+    bounds = edges.tolist()
+    indices = [0]
+    previous = 0
+    if n > LTTB_VECTOR_BUCKET_POINTS * (threshold - 2):
+        # Large buckets (hundreds of thousands of points per trace): each pick depends on the one
+        # before, so buckets stay sequential, but the points within one are scored by numpy
+        for bucket in range(threshold - 2):
+            start, end = bounds[bucket], bounds[bucket + 1]
+            px, py = x.item(previous), y.item(previous)
+            nx, ny = next_x[bucket], next_y[bucket]
+            areas = (px - nx) * (y[start:end] - py)
+            areas -= (px - x[start:end]) * (ny - py)
+            previous = start + int(np.abs(areas).argmax())
+            indices.append(previous)
+    else:
+        # A few points per bucket: plain Python is cheaper than a numpy call per bucket
+        xs, ys = x.tolist(), y.tolist()
+        for bucket in range(threshold - 2):
+            px, py = xs[previous], ys[previous]
+            nx, ny = next_x[bucket], next_y[bucket]
+            best_area = -1.0
+            for i in range(bounds[bucket], bounds[bucket + 1]):
+                # Twice the triangle area; the constant factor does not change the argmax
+                area = abs((px - nx) * (ys[i] - py) - (px - xs[i]) * (ny - py))
+                if area > best_area:
+                    best_area, previous = area, i
+            indices.append(previous)
+    indices.append(n - 1)
+
+    return np.array(indices)
+
+def minmax_indices(y, threshold):
+    """Indices of the minimum and maximum of each of threshold // 2 equal buckets, in order."""
+    n = len(y)
+    buckets = threshold // 2
+    if threshold >= n or buckets < 1:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(0, n, buckets + 1).astype(int)
+    picks = []
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end > start:
+            segment = y[start:end]
+            picks.extend({start + int(np.nanargmin(segment)), start + int(np.nanargmax(segment))})
+    return np.unique(picks)
+
+def downsample_series(series, max_points, method='lttb'):
+    """Reduce a time-indexed Series to at most max_points points with LTTB or min/max buckets."""
+    if len(series) <= max_points:
+        return series
+    if method == 'minmax':
+        indices = minmax_indices(series.to_numpy(), max_points)
+    else:
+        x = series.index.asi8 if isinstance(series.index, pd.DatetimeIndex) else np.arange(len(series))
+        indices = lttb_indices(x, series.to_numpy(), max_points)
+    return series.iloc[indices]
+
+def clip_to_range(data, x_range):
+    """Rows of a time-indexed frame or Series inside x_range = (start, end); None keeps everything."""
+    if x_range is None:
+        return data
+    start, end = x_range
+    return data.loc[pd.Timestamp(start):pd.Timestamp(end)]
@@ -0,0 +1,155 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+from statistics import NormalDist
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+from models.database import ForecastModel, WasteDailyRollup, WASTE_TYPES
+
+# Department key used for the "All Departments" models
+ALL_DEPARTMENTS = '*'
+
+STAT_FIELDS = ['n', 'sum_t', 'sum_tt', 'sum_y', 'sum_ty', 'sum_yy']
+
+def _new_model(department_key, waste_type, origin_day, template=None):
+    """Create an empty model, copying the day-count terms of template so all types share one time axis."""
+    model = ForecastModel(
+        department=department_key,
+        waste_type=waste_type,
+        origin_day=origin_day,
+        last_day=origin_day - timedelta(days=1),
+        n=0, sum_t=0.0, sum_tt=0.0, sum_y=0.0, sum_ty=0.0, sum_yy=0.0
+    )
+    if template is not None:
+        model.last_day = template.last_day
+        model.n = template.n
+        model.sum_t = template.sum_t
+        model.sum_tt = template.sum_tt
+    return model
+
+def refresh_forecast_models(session, department=None, today=None):
+    """Fold the complete days added since the last fit into the stored models for a department.
+
+    Only rollup rows newer than the models' last_day are read, so a refit costs
+    O(new days) rather than O(history). Returns the models keyed by waste type.
+    """
+    department_key = department or ALL_DEPARTMENTS
+    today = today or datetime.utcnow().date()
+    models = {
+        model.waste_type: model
+        for model in session.query(ForecastModel).filter_by(department=department_key)
+    }
+    last_day = next(iter(models.values())).last_day if models else None
+
+    # Today's totals are still growing, so only whole days are folded in
+    query = session.query(
+        WasteDailyRollup.day,
+        WasteDailyRollup.waste_type,
+        func.sum(WasteDailyRollup.total_amount)
+    ).filter(WasteDailyRollup.day < today)
+    if department:
+        query = query.filter(WasteDailyRollup.department == department)
+    if last_day is not None:
+        query = query.filter(WasteDailyRollup.day > last_day)
+    rows = query.group_by(WasteDailyRollup.day, WasteDailyRollup.waste_type).all()
+
+    if not models:
+        if not rows:
+            return models
+        origin_day = min(row[0] for row in rows)
+        for waste_type in WASTE_TYPES:
+            models[waste_type] = _new_model(department_key, waste_type, origin_day)
+            session.add(models[waste_type])
+
+    template = next(iter(models.values()))
+    for waste_type in sorted({row[1] for row in rows} - set(models)):
+        models[waste_type] = _new_model(department_key, waste_type, template.origin_day, template)
+        session.add(models[waste_type])
+
+    first_new = template.last_day + timedelta(days=1)
+    last_new = today - timedelta(days=1)
+    if last_new < first_new:
+        return models
+
+    # Every day in the new range counts as an observation, including days without entries (y = 0)
+    origin_day = template.origin_day
+    t = np.arange((first_new - origin_day).days, (last_new - origin_day).days + 1, dtype=float)
+    for model in models.values():
+        model.n += len(t)
+        model.sum_t += float(t.sum())
+        model.sum_tt += float((t * t).sum())
+        model.last_day = last_new
+
+    for day, waste_type, total in rows:
+        t_day = float((day - origin_day).days)
+        model = models[waste_type]
+        model.sum_y += total
+        model.sum_ty += t_day * total
+        model.sum_yy += total * total
+
+    try:
+        session.commit()
+    except (StaleDataError, IntegrityError):
+        # Another process folded the same days first; use its result
+        session.rollback()
+        return {
+            model.waste_type: model
+            for model in session.query(ForecastModel).filter_by(department=department_key)
+        }
+    return models
+
+def forecast_from_models(models, periods=30, level=0.95):
+    """Linear trend forecast with prediction intervals from stored sufficient statistics.
+
+    Returns (predictions, lower, upper) DataFrames with one column per waste type,
+    or None when fewer than two days have been folded in.
+    """
+    if not models:
+        return None
+
+    waste_types = [wt for wt in WASTE_TYPES if wt in models] + sorted(set(models) - set(WASTE_TYPES))
+    stats = np.array([[getattr(models[wt], field) for field in STAT_FIELDS] for wt in waste_types], dtype=float)
+    n, sum_t, sum_tt, sum_y, sum_ty, sum_yy = stats.T
+    if n[0] < 2:
+        return None
+
+    s_tt = sum_tt - sum_t * sum_t / n
+    s_ty = sum_ty - sum_t * sum_y / n
+    slopes = np.where(s_tt > 0, s_ty / np.where(s_tt > 0, s_tt, 1.0), 0.0)
+    intercepts = (sum_y - slopes * sum_t) / n
+    sse = np.maximum(sum_yy - intercepts * sum_y - slopes * sum_ty, 0.0)
+    sigma = np.sqrt(sse / np.maximum(n - 2, 1))
+
+    template = models[waste_types[0]]
+    first_t = (template.last_day - template.origin_day).days + 1
+    t_future = np.arange(first_t, first_t + periods, dtype=float)
+    predictions = intercepts + np.outer(t_future, slopes)
+
+    t_mean = sum_t / n
+    leverage = 1.0 + 1.0 / n + (t_future[:, None] - t_mean) ** 2 / np.where(s_tt > 0, s_tt, np.inf)
+    z = NormalDist().inv_cdf(0.5 + level / 2.0)
+    margin = z * np.sqrt(leverage) * sigma
+
+    future_dates = pd.date_range(start=template.last_day + timedelta(days=1), periods=periods, freq='D')
+
+    def frame(data):
+        return pd.DataFrame(data, index=future_dates, columns=waste_types)
+
+    return frame(predictions), frame(predictions - margin), frame(predictions + margin)
+
+def forecast_department(session, department=None, periods=30, level=0.95):
+    """Refresh the stored models for a department (None for all) and forecast from them."""
+    return forecast_from_models(refresh_forecast_models(session, department), periods, level)
+
+def reset_forecast_models(session, departments=None):
+    """Drop stored models so the next refresh refits from scratch.
+
+    Needed when entries are back-filled for days that were already folded in.
+    Models for the given departments and the all-departments models are dropped.
+    """
+    query = session.query(ForecastModel)
+    if departments is not None:
+        query = query.filter(ForecastModel.department.in_(list(departments) + [ALL_DEPARTMENTS]))
+    query.delete(synchronize_session='fetch')
+    session.commit()
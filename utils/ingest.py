@@ -0,0 +1,268 @@
+import argparse
+import csv
+import io
+import os
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+
+from auth.auth_handler import DEPARTMENTS
+from models.database import WasteEntry, WASTE_TYPES, get_engine, get_session
+from models.rollups import apply_rollup_deltas, rollup_deltas_from_entries, rollup_deltas_from_frame
+from models.write_queue import run_write
+from utils.dashboard_data import invalidate_departments
+from utils.forecast_store import reset_forecast_models
+
+ENTRY_COLUMNS = ['user_id', 'department', 'waste_type', 'amount', 'timestamp']
+REQUIRED_COLUMNS = ['department', 'waste_type', 'amount']
+DEFAULT_CHUNK_SIZE = 50000
+# Up to this many rows a plain loop builds rollup deltas faster than a pandas groupby
+SMALL_WRITE_ROWS = 64
+
+class IngestReport:
+    """Running totals for one import."""
+
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_written = 0
+        self.rows_rejected = 0
+        self.seconds = 0.0
+        self.departments = set()
+        self.earliest = None
+        self.errors = []
+
+    def add_written(self, rows):
+        """Count validated rows that have been committed."""
+        self.rows_written += len(rows)
+        if not rows.empty:
+            self.departments.update(rows['department'].unique())
+            earliest = rows['timestamp'].min()
+            if self.earliest is None or earliest < self.earliest:
+                self.earliest = earliest
+
+    @property
+    def rows_per_second(self):
+        return self.rows_written / self.seconds if self.seconds else 0.0
+
+    def summary(self):
+        return (
+            f"{self.rows_written:,} rows written, {self.rows_rejected:,} rejected "
+            f"in {self.seconds:.2f}s ({self.rows_per_second:,.0f} rows/sec)"
+        )
+
+class IngestError(RuntimeError):
+    """Raised when an import stops part-way; `report` covers the rows written before it."""
+
+    def __init__(self, message, report):
+        super().__init__(message)
+        self.report = report
+
+def detect_format(name):
+    """Guess the file format from a file name."""
+    return 'parquet' if str(name).lower().endswith(('.parquet', '.pq')) else 'csv'
+
+def read_chunks(source, file_format='csv', chunksize=DEFAULT_CHUNK_SIZE):
+    """Stream a CSV or Parquet file (path or file object) as DataFrames of at most chunksize rows."""
+    if file_format == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet import requires pyarrow: pip install pyarrow")
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunksize)
+
+def validate_chunk(chunk, user_id=None, departments=None, waste_types=None):
+    """Return (valid rows, list of error messages) for a chunk of raw readings.
+
+    Rows need a known department (one of `departments` when given) and waste type,
+    a positive finite amount and an integer user_id if any; a missing user_id falls
+    back to the importing user. Timestamps with a UTC offset are converted to UTC,
+    timestamps without one are taken to be UTC already, and a missing timestamp means
+    "now"; all are stored as naive UTC like WasteEntry defaults.
+    """
+    department_reason = 'department not allowed for this import' if departments else 'unknown department'
+    departments = departments or DEPARTMENTS
+    waste_types = waste_types or WASTE_TYPES
+
+    missing = [column for column in REQUIRED_COLUMNS if column not in chunk.columns]
+    if missing:
+        return chunk.iloc[0:0], [f"Missing required columns: {', '.join(missing)}"]
+
+    rows = pd.DataFrame({
+        'department': chunk['department'].astype(str).str.strip(),
+        'waste_type': chunk['waste_type'].astype(str).str.strip(),
+        'amount': pd.to_numeric(chunk['amount'], errors='coerce')
+    }, index=chunk.index)
+
+    now = pd.Timestamp(datetime.utcnow())
+    unparseable = pd.Series(False, index=chunk.index)
+    if 'timestamp' in chunk.columns:
+        raw = chunk['timestamp']
+        timestamps = pd.to_datetime(raw, utc=True, errors='coerce')
+        retry = timestamps.isna() & raw.notna()
+        if retry.any():
+            # The format is inferred from the first value; rows written another way (naive
+            # among offsets, a date without a time) get a second, slower pass
+            timestamps[retry] = pd.to_datetime(raw[retry], utc=True, errors='coerce', format='mixed')
+        unparseable = timestamps.isna() & raw.notna()
+        rows['timestamp'] = timestamps.dt.tz_convert(None).fillna(now)
+    else:
+        rows['timestamp'] = now
+
+    if 'user_id' in chunk.columns:
+        user_ids = pd.to_numeric(chunk['user_id'], errors='coerce')
+        if user_id is not None:
+            user_ids = user_ids.fillna(user_id)
+    else:
+        user_ids = pd.Series(user_id, index=chunk.index, dtype='float64')
+    bad_user_ids = user_ids.notna() & ~((user_ids % 1 == 0) & (user_ids.abs() < 2 ** 63))
+    rows['user_id'] = user_ids.mask(bad_user_ids).astype('Int64')
+
+    checks = {
+        department_reason: ~rows['department'].isin(departments),
+        'unknown waste type': ~rows['waste_type'].isin(waste_types),
+        'amount is not a positive number': ~((rows['amount'] > 0) & np.isfinite(rows['amount'])),
+        'unparseable timestamp': unparseable,
+        'user_id is not an integer': bad_user_ids
+    }
+    invalid = pd.Series(False, index=rows.index)
+    errors = []
+    for reason, mask in checks.items():
+        if mask.any():
+            errors.append(f"{int(mask.sum())} rows: {reason}")
+            invalid |= mask
+
+    return rows.loc[~invalid, ENTRY_COLUMNS], errors
+
+def _copy_rows(connection, rows):
+    """Load rows with Postgres COPY through the raw psycopg2 connection."""
+    buffer = io.StringIO()
+    rows.to_csv(buffer, index=False, header=False, date_format='%Y-%m-%d %H:%M:%S.%f', quoting=csv.QUOTE_MINIMAL)
+    buffer.seek(0)
+    with connection.connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {WasteEntry.__tablename__} ({', '.join(ENTRY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+
+def prepare_rows(rows):
+    """Insert records and rollup deltas for validated rows: the pandas half of a write."""
+    records = rows.astype(object).where(rows.notna(), None).to_dict('records')
+    if len(records) <= SMALL_WRITE_ROWS:
+        return records, rollup_deltas_from_entries(SimpleNamespace(**record) for record in records)
+    return records, rollup_deltas_from_frame(rows)
+
+def write_records(connection, records, deltas):
+    """Insert prepared records and fold their deltas into the daily rollup on the same connection."""
+    connection.execute(insert(WasteEntry.__table__), records)
+    apply_rollup_deltas(connection, deltas)
+
+def write_rows(connection, rows):
+    """Insert validated rows and fold them into the daily rollup on the same connection."""
+    if rows.empty:
+        return
+    if connection.dialect.name == 'postgresql':
+        _copy_rows(connection, rows)
+        apply_rollup_deltas(connection, rollup_deltas_from_frame(rows))
+    else:
+        write_records(connection, *prepare_rows(rows))
+
+def insert_rows(rows, engine=None):
+    """Write validated rows in a transaction of their own.
+
+    On SQLite the rows are converted on the calling thread and written by the
+    database's single writer thread, which then only has SQL to run.
+    """
+    engine = engine or get_engine()
+    if rows.empty:
+        return
+    if engine.dialect.name == 'postgresql':
+        with engine.begin() as connection:
+            write_rows(connection, rows)
+        return
+    records, deltas = prepare_rows(rows)
+    run_write(lambda connection: write_records(connection, records, deltas), engine)
+
+def ingest_chunks(chunks, user_id=None, engine=None, progress=None, departments=None):
+    """Validate and write an iterable of DataFrames, one transaction per chunk.
+
+    Rows outside `departments`, when given, are rejected like unknown departments.
+    progress, if given, is called with the running IngestReport after every chunk.
+    A failing chunk (e.g. a malformed CSV line) raises IngestError carrying the report
+    of the chunks already written, which stay committed.
+    """
+    engine = engine or get_engine()
+    report = IngestReport()
+    started = time.perf_counter()
+
+    try:
+        for chunk in chunks:
+            rows, errors = validate_chunk(chunk, user_id=user_id, departments=departments)
+            insert_rows(rows, engine)
+
+            report.rows_read += len(chunk)
+            report.add_written(rows)
+            report.rows_rejected += len(chunk) - len(rows)
+            report.errors.extend(errors)
+            report.seconds = time.perf_counter() - started
+            if progress:
+                progress(report)
+    except Exception as e:
+        raise IngestError(f"Import stopped after {report.rows_written:,} rows were written: {e}", report) from e
+    finally:
+        # Chunks written before a failure stay committed, so caches and forecast models must still hear of them
+        after_ingest(report)
+    return report
+
+def ingest_file(source, file_format=None, chunksize=DEFAULT_CHUNK_SIZE, user_id=None, engine=None, progress=None,
+                departments=None):
+    """Import a CSV or Parquet file of waste readings; returns an IngestReport."""
+    file_format = file_format or detect_format(getattr(source, 'name', source))
+    return ingest_chunks(read_chunks(source, file_format, chunksize), user_id, engine, progress, departments)
+
+def after_ingest(report):
+    """Invalidate cached dashboard data and stale forecast models touched by an import."""
+    if not report.departments:
+        return
+
+    invalidate_departments(report.departments)
+    # Readings for days that were already folded into a forecast model need a full refit
+    yesterday = datetime.utcnow().date() - timedelta(days=1)
+    if report.earliest is not None and report.earliest.date() <= yesterday:
+        reset_forecast_models(get_session(), report.departments)
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import waste readings from CSV or Parquet files.")
+    parser.add_argument('files', nargs='+', help="CSV or Parquet files with department, waste_type, amount "
+                                                 "and optional timestamp and user_id columns")
+    parser.add_argument('--format', choices=['csv', 'parquet'], help="File format (default: from extension)")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--user-id', type=int, help="user_id for rows that do not carry one")
+    args = parser.parse_args()
+
+    def progress(report):
+        print(f"  {report.rows_read:,} rows read, {report.rows_per_second:,.0f} rows/sec", end='\r')
+
+    for path in args.files:
+        if not os.path.exists(path):
+            print(f"❌ {path}: file not found")
+            continue
+        print(f"Importing {path}...")
+        try:
+            report = ingest_file(path, args.format, args.chunksize, args.user_id, progress=progress)
+        except IngestError as e:
+            print(f"\n❌ {path}: {e}")
+            report = e.report
+        else:
+            print(f"\n✅ {path}: {report.summary()}")
+        for error in report.errors[:20]:
+            print(f"   ⚠️ {error}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import os
+import threading
+import time
+from collections import deque
+
+import pandas as pd
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models.database import WasteEntry, WASTE_TYPES, get_engine, get_session
+from models.queries import get_time_window_start, get_waste_totals
+
+# A display polls at most this often, however many sessions share its feed
+LIVE_POLL_SECONDS = float(os.getenv('LIVE_POLL_SECONDS', '2'))
+# Reload from the rollups now and then so the window slides and any drift is corrected
+LIVE_REBASE_SECONDS = float(os.getenv('LIVE_REBASE_SECONDS', '300'))
+# More new rows than this in one poll is cheaper to pick up by reloading the rollups
+LIVE_MAX_DELTA_ROWS = int(os.getenv('LIVE_MAX_DELTA_ROWS', '10000'))
+# Ids below the high-water mark re-checked on every poll, for rows whose transaction commits late
+LIVE_LOOKBACK_IDS = int(os.getenv('LIVE_LOOKBACK_IDS', '5000'))
+
+class LiveFeed:
+    """Daily totals for a department (None for all) and time range, kept current by polling.
+
+    The feed starts from the daily totals and the highest WasteEntry id, both read from
+    the database in one snapshot, and from then on reads only rows above that high-water
+    mark, a primary key range scan, adding them to a copy of the frame so displays
+    refreshing every few seconds never re-aggregate the table.
+
+    Ids are handed out when a row is inserted, not when it commits, so a long
+    transaction (a bulk import or buffered API flush) can commit rows below ids the
+    feed has already seen. Each poll therefore re-reads the last LIVE_LOOKBACK_IDS ids
+    below the mark and adds the ones it has not counted yet; rows committing further
+    behind than that only appear at the next rebase.
+    """
+
+    def __init__(self, department, time_range, poll_seconds=LIVE_POLL_SECONDS, rebase_seconds=LIVE_REBASE_SECONDS):
+        self.department = department
+        self.time_range = time_range
+        self.poll_seconds = poll_seconds
+        self.rebase_seconds = rebase_seconds
+        self.frame = None
+        self.high_water = 0
+        self.seen_ids = set()
+        self.new_entries = 0
+        self.recent = deque(maxlen=20)
+        self.updated_at = None
+        self._based = 0.0
+        self._polled = 0.0
+        self._lock = threading.Lock()
+
+    def poll(self):
+        """Return the current daily frame, fetching new entries if the last poll is old enough."""
+        with self._lock:
+            now = time.monotonic()
+            if self.frame is None or now - self._based >= self.rebase_seconds:
+                self._rebase()
+            elif now - self._polled >= self.poll_seconds:
+                self._fetch_new()
+            return self.frame
+
+    def _rebase(self):
+        start = get_time_window_start(self.time_range)
+        with get_engine().connect() as connection:
+            # The mark, the ids below it and the totals must come from one snapshot, so the
+            # totals hold exactly the rows the feed counts as seen
+            if connection.dialect.name == 'postgresql':
+                connection.execution_options(isolation_level='REPEATABLE READ')
+            else:
+                connection.exec_driver_sql('BEGIN')
+            with Session(bind=connection) as session:
+                high_water = session.query(func.max(WasteEntry.id)).scalar() or 0
+                seen_ids = session.query(WasteEntry.id).filter(WasteEntry.id > high_water - LIVE_LOOKBACK_IDS).all()
+                self.frame = get_waste_totals(session, 'day', self.department, start)
+        self.high_water = high_water
+        self.seen_ids = {row.id for row in seen_ids}
+        self._based = self._polled = time.monotonic()
+        self.updated_at = pd.Timestamp.utcnow()
+
+    def _fetch_new(self):
+        query = get_session().query(
+            WasteEntry.id,
+            WasteEntry.timestamp,
+            WasteEntry.waste_type,
+            WasteEntry.amount
+        ).filter(WasteEntry.id > self.high_water - LIVE_LOOKBACK_IDS)
+        # Rows before the window are not shown; the bound also prunes old partitions on PostgreSQL
+        start = get_time_window_start(self.time_range)
+        if start is not None:
+            query = query.filter(WasteEntry.timestamp >= start)
+        if self.department:
+            query = query.filter(WasteEntry.department == self.department)
+        limit = LIVE_MAX_DELTA_ROWS + LIVE_LOOKBACK_IDS
+        rows = query.order_by(WasteEntry.id).limit(limit + 1).all()
+        self._polled = time.monotonic()
+
+        if len(rows) > limit:
+            self._rebase()
+            return
+        rows = [row for row in rows if row.id not in self.seen_ids]
+        if rows:
+            self._append(rows)
+            self.updated_at = pd.Timestamp.utcnow()
+
+    def _append(self, rows):
+        new = pd.DataFrame(rows, columns=['id', 'timestamp', 'waste_type', 'amount'])
+        daily = new.assign(date=pd.to_datetime(new['timestamp']).dt.normalize()).pivot_table(
+            index='date', columns='waste_type', values='amount', aggfunc='sum'
+        )
+        daily = daily.reindex(columns=WASTE_TYPES, fill_value=0.0).fillna(0.0)
+        daily.columns.name = None
+
+        # Sessions may still be drawing the previous frame, so build a new frame instead of updating it
+        if self.frame.empty:
+            self.frame = daily
+        else:
+            self.frame = self.frame.add(daily, fill_value=0.0)[WASTE_TYPES]
+
+        self.high_water = max(self.high_water, int(new['id'].iloc[-1]))
+        floor = self.high_water - LIVE_LOOKBACK_IDS
+        self.seen_ids = {id_ for id_ in self.seen_ids if id_ > floor}
+        self.seen_ids.update(new['id'].tolist())
+        self.new_entries += len(new)
+        self.recent.extendleft(new[['timestamp', 'waste_type', 'amount']].itertuples(index=False, name=None))
+
+_feeds = {}
+_feeds_lock = threading.Lock()
+
+def get_live_feed(department, time_range):
+    """Process-wide feed for a department and time range, shared by every live display."""
+    key = (department, time_range)
+    with _feeds_lock:
+        if key not in _feeds:
+            _feeds[key] = LiveFeed(department, time_range)
+        return _feeds[key]
@@ -1,37 +1,132 @@
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
-from datetime import timedelta
-
-def predict_waste(historical_data):
-    """Generate waste predictions using simple linear regression."""
-    
-    predictions = pd.DataFrame()
-    
-    # Create future dates
-    last_date = historical_data.index[-1]
-    future_dates = pd.date_range(
-        start=last_date + timedelta(days=1),
-        periods=30,
-        freq='D'
-    )
-    
-    for waste_type in ['Paper', 'Plastic', 'PET', 'Toxic']:
-        # Prepare features (days since start)
-        X = np.array(range(len(historical_data))).reshape(-1, 1)
-        y = historical_data[waste_type].values
-        
-        # Fit model
-        model = LinearRegression()
-        model.fit(X, y)
-        
-        # Predict future values
-        X_future = np.array(range(
-            len(historical_data),
-            len(historical_data) + len(future_dates)
-        )).reshape(-1, 1)
-        
-        predictions[waste_type] = model.predict(X_future)
-    
-    predictions.index = future_dates
-    return predictions
\ No newline at end of file
+from statistics import NormalDist
+
+def fit_linear_trends(values):
+    """Fit y = intercept + slope * t for every column of a 2-D array at once.
+
+    Rows are observations at t = 0..n-1 and columns are independent series.
+    Returns intercepts, slopes and residual standard deviations, one per column.
+    """
+    values = np.asarray(values, dtype=float)
+    n = values.shape[0]
+    t_mean = (n - 1) / 2.0
+    t_centered = np.arange(n, dtype=float) - t_mean
+    s_tt = t_centered @ t_centered
+
+    y_mean = values.mean(axis=0)
+    y_centered = values - y_mean
+    if s_tt > 0:
+        slopes = (t_centered @ y_centered) / s_tt
+    else:
+        slopes = np.zeros(values.shape[1])
+    intercepts = y_mean - slopes * t_mean
+
+    # Residual sum of squares from the centered sums, without building the residual matrix
+    sse = np.maximum((y_centered * y_centered).sum(axis=0) - slopes * slopes * s_tt, 0.0)
+    sigma = np.sqrt(sse / max(n - 2, 1))
+    return intercepts, slopes, sigma
+
+def sampling_step(index):
+    """Typical spacing of a DatetimeIndex (the median gap), one day when it cannot be told."""
+    day = pd.Timedelta(days=1)
+    step = pd.Series(index).diff().median() if len(index) > 1 else day
+    if pd.isna(step) or step <= pd.Timedelta(0):
+        step = day
+    return step
+
+def forecast_linear(historical_data, periods=30, level=0.95):
+    """Forecast every column of historical_data with a linear trend.
+
+    Rows are taken to be evenly spaced; the forecast covers the next `periods` rows at
+    the same interval (days for daily data). Returns (predictions, lower, upper)
+    DataFrames, where lower/upper bound the `level` prediction interval.
+    """
+    n = len(historical_data)
+    intercepts, slopes, sigma = fit_linear_trends(historical_data.to_numpy(dtype=float))
+
+    t_future = np.arange(n, n + periods, dtype=float)
+    predictions = intercepts + np.outer(t_future, slopes)
+
+    # Interval widens with distance from the centre of the fitted range
+    t_mean = (n - 1) / 2.0
+    s_tt = n * (n * n - 1) / 12.0
+    leverage = 1.0 + 1.0 / n + ((t_future - t_mean) ** 2 / s_tt if s_tt > 0 else 0.0)
+    z = NormalDist().inv_cdf(0.5 + level / 2.0)
+    margin = z * np.outer(np.sqrt(leverage), sigma)
+
+    step = sampling_step(historical_data.index)
+    future_dates = historical_data.index[-1] + pd.to_timedelta(np.arange(1, periods + 1) * step)
+    columns = historical_data.columns
+
+    def frame(data):
+        return pd.DataFrame(data, index=future_dates, columns=columns)
+
+    return frame(predictions), frame(predictions - margin), frame(predictions + margin)
+
+WEEK_DAYS = 7.0
+YEAR_DAYS = 365.25
+
+def _resolvable_order(period, step_days):
+    """Harmonics of a cycle the sampling step can resolve: each must be sampled more than twice a period."""
+    return max(int(np.ceil(period / (2 * step_days))) - 1, 0)
+
+def _seasonal_design(t_days, weekly_order, annual_order):
+    """Design matrix of intercept, linear trend and Fourier terms for the weekly and annual cycles."""
+    columns = [np.ones_like(t_days), t_days]
+    for period, order in ((WEEK_DAYS, weekly_order), (YEAR_DAYS, annual_order)):
+        if order:
+            angles = 2 * np.pi * np.outer(t_days, np.arange(1, order + 1)) / period
+            columns.extend([np.sin(angles), np.cos(angles)])
+    return np.column_stack(columns)
+
+def forecast_seasonal(historical_data, periods=30, level=0.95, weekly_order=3, annual_order=2):
+    """Forecast every column of historical_data with a trend plus weekly and annual seasonality.
+
+    All series share one least-squares solve over the Fourier design matrix. A cycle is
+    only modelled when the history covers it at least twice (weekly) or once (annual),
+    and only with the harmonics the sampling step resolves, so weekly or monthly
+    buckets get no weekly terms. Works at any regular sampling interval; the forecast
+    covers the next `periods` days at the same interval. Returns (predictions, lower,
+    upper) DataFrames.
+    """
+    index = historical_data.index
+    day = pd.Timedelta(days=1)
+    step = sampling_step(index)
+
+    t_days = ((index - index[0]) / day).to_numpy(dtype=float)
+    span_days = t_days[-1] if len(t_days) else 0.0
+    step_days = step / day
+    weekly_order = min(weekly_order, _resolvable_order(WEEK_DAYS, step_days)) if span_days >= 2 * WEEK_DAYS else 0
+    annual_order = min(annual_order, _resolvable_order(YEAR_DAYS, step_days)) if span_days >= YEAR_DAYS else 0
+
+    design = _seasonal_design(t_days, weekly_order, annual_order)
+    values = historical_data.to_numpy(dtype=float)
+    coefficients, _, rank, _ = np.linalg.lstsq(design, values, rcond=None)
+
+    residuals = values - design @ coefficients
+    dof = max(len(values) - rank, 1)
+    sigma = np.sqrt((residuals * residuals).sum(axis=0) / dof)
+
+    steps = max(int(round(periods * day / step)), 1)
+    future_dates = index[-1] + pd.to_timedelta(np.arange(1, steps + 1) * step)
+    future_design = _seasonal_design(((future_dates - index[0]) / day).to_numpy(dtype=float), weekly_order, annual_order)
+    predictions = future_design @ coefficients
+
+    # Per-point leverage x0' (X'X)^-1 x0, shared by every series
+    xtx_inv = np.linalg.pinv(design.T @ design)
+    leverage = 1.0 + np.einsum('ij,jk,ik->i', future_design, xtx_inv, future_design)
+    z = NormalDist().inv_cdf(0.5 + level / 2.0)
+    margin = z * np.outer(np.sqrt(leverage), sigma)
+
+    columns = historical_data.columns
+
+    def frame(data):
+        return pd.DataFrame(data, index=future_dates, columns=columns)
+
+    return frame(predictions), frame(predictions - margin), frame(predictions + margin)
+
+def predict_waste(historical_data, periods=30):
+    """Generate waste predictions using a linear trend fitted to all waste types at once."""
+    predictions, _, _ = forecast_linear(historical_data, periods)
+    return predictions
@@ -0,0 +1,242 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+from auth.auth_handler import DEPARTMENTS
+from models.database import DepartmentTotal, get_engine, get_session, remove_session
+from models.partitioning import create_future_partitions
+from models.queries import TIME_RANGES, get_time_window_start, get_waste_totals
+from models.rollups import reconcile_department_totals, reconcile_recent_rollups
+from models.write_queue import run_write
+from utils.aggregates import compute_aggregates
+from utils.dashboard_data import (
+    data_version,
+    invalidate_departments,
+    load_department_stats
+)
+from utils.forecast_store import forecast_department
+from utils.ml_predictor import forecast_seasonal
+from utils.visualizations import get_waste_insights
+
+# Seconds between checks for changed data, and the age after which state is recomputed anyway
+REFRESH_POLL_SECONDS = float(os.getenv('REFRESH_POLL_SECONDS', '2'))
+REFRESH_INTERVAL_SECONDS = float(os.getenv('REFRESH_INTERVAL_SECONDS', '300'))
+# How often the last RECONCILE_DAYS of the daily rollup are checked against the entries,
+# and the running department totals against the rollup
+RECONCILE_INTERVAL_SECONDS = float(os.getenv('RECONCILE_INTERVAL_SECONDS', '3600'))
+RECONCILE_DAYS = int(os.getenv('RECONCILE_DAYS', '7'))
+# How often upcoming monthly partitions are created on a partitioned PostgreSQL table
+PARTITION_CHECK_SECONDS = float(os.getenv('PARTITION_CHECK_SECONDS', '3600'))
+
+class DashboardState:
+    """Precomputed dashboard data for one department (None for all) and time range."""
+
+    def __init__(self, department, time_range, version, history, aggregates, insights, forecasts):
+        self.department = department
+        self.time_range = time_range
+        self.version = version
+        self.history = history
+        self.aggregates = aggregates
+        self.insights = insights
+        self.forecasts = forecasts
+        self.computed_at = datetime.utcnow()
+        self._computed = time.monotonic()
+
+class RefreshWorker:
+    """Background thread that keeps DashboardState current for every department and time range.
+
+    State is recomputed when a department's data version moves on, and at least every
+    REFRESH_INTERVAL_SECONDS so forecasts roll over with the day. Versions move on with
+    writes made in this process; writes from other processes (the ingestion API, CLI
+    imports) are noticed each cycle as a change in the department's running totals,
+    which invalidates it here too. State is computed from the database, never from the
+    query cache, so a recompute cannot republish a cached frame. Department statistics
+    are kept warm in the query cache, the recent rollup and the running department
+    totals are reconciled with the entries every RECONCILE_INTERVAL_SECONDS and, on
+    partitioned PostgreSQL, the coming months' partitions are created every
+    PARTITION_CHECK_SECONDS. Pages read the published state and only compute
+    synchronously when it is missing or stale.
+    """
+
+    def __init__(self, departments=None, time_ranges=None,
+                 poll_seconds=REFRESH_POLL_SECONDS, interval_seconds=REFRESH_INTERVAL_SECONDS,
+                 reconcile_seconds=RECONCILE_INTERVAL_SECONDS, partition_seconds=PARTITION_CHECK_SECONDS):
+        self.departments = [None] + list(departments or DEPARTMENTS)
+        self.time_ranges = list(time_ranges or TIME_RANGES)
+        self.poll_seconds = poll_seconds
+        self.interval_seconds = interval_seconds
+        self.reconcile_seconds = reconcile_seconds
+        self._reconciled = float('-inf')
+        self.reconciled_departments = 0
+        self.partition_seconds = partition_seconds
+        self._partitions_checked = float('-inf')
+        self.partitions_created = 0
+        self._states = {}
+        self._totals = None
+        self.external_changes = 0
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self.cycles = 0
+        self.refreshed = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_cycle_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name='dashboard-refresh', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def get(self, department, time_range):
+        """Published state for the department and range, or None if missing or out of date."""
+        with self._lock:
+            state = self._states.get((department, time_range))
+        if state is None or state.version != data_version(department):
+            return None
+        return state
+
+    def _is_due(self, department, time_range):
+        with self._lock:
+            state = self._states.get((department, time_range))
+        return (
+            state is None
+            or state.version != data_version(department)
+            or time.monotonic() - state._computed >= self.interval_seconds
+        )
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.refresh_due()
+            self._stopped.wait(self.poll_seconds)
+
+    def refresh_due(self):
+        """Recompute every state that is missing, stale or too old; returns how many were refreshed."""
+        started = time.perf_counter()
+        refreshed = 0
+        try:
+            self._detect_changes()
+            for department in self.departments:
+                due = [time_range for time_range in self.time_ranges if self._is_due(department, time_range)]
+                if not due:
+                    continue
+                # Read the version first so data written while computing leaves the state stale
+                version = data_version(department)
+                # Forecasts do not depend on the time range, so they are fitted once per department
+                forecasts = self._forecasts(department)
+                for time_range in due:
+                    self._publish(self._compute(department, time_range, version, forecasts))
+                    refreshed += 1
+            if refreshed:
+                for department in self.departments:
+                    for time_range in [None] + self.time_ranges:
+                        load_department_stats(department, time_range)
+            if time.monotonic() - self._reconciled >= self.reconcile_seconds:
+                days = RECONCILE_DAYS
+                fixed = set(run_write(lambda connection: reconcile_recent_rollups(connection, days)))
+                fixed.update(reconcile_department_totals(get_session()))
+                self._reconciled = time.monotonic()
+                if fixed:
+                    self.reconciled_departments += len(fixed)
+                    invalidate_departments(fixed)
+            if time.monotonic() - self._partitions_checked >= self.partition_seconds:
+                self.partitions_created += len(create_future_partitions(get_engine()))
+                self._partitions_checked = time.monotonic()
+        except Exception as e:
+            self.errors += 1
+            self.last_error = f"{type(e).__name__}: {e}"
+        finally:
+            remove_session()
+        self.cycles += 1
+        self.refreshed += refreshed
+        if refreshed:
+            self.last_cycle_seconds = time.perf_counter() - started
+        return refreshed
+
+    def _detect_changes(self):
+        """Invalidate departments whose running totals changed since the last cycle; returns them.
+
+        department_totals is updated in the same transaction as every entry written by
+        any process, so comparing its few rows is enough to see writes this process's
+        data versions never heard of.
+        """
+        rows = get_session().query(
+            DepartmentTotal.department, DepartmentTotal.entry_count, DepartmentTotal.total_amount
+        ).all()
+        totals = {row.department: (row.entry_count, row.total_amount) for row in rows}
+        previous, self._totals = self._totals, totals
+        if previous is None:
+            return set()
+        changed = {department for department in totals.keys() | previous.keys()
+                   if totals.get(department) != previous.get(department)}
+        if changed:
+            self.external_changes += 1
+            invalidate_departments(changed)
+        return changed
+
+    def _forecasts(self, department):
+        forecasts = {}
+        linear = forecast_department(get_session(), department)
+        if linear is not None:
+            forecasts["Linear Trend"] = linear
+        year = get_waste_totals(get_session(), 'day', department, get_time_window_start("Last Year"))
+        if len(year) >= 2:
+            forecasts["Seasonal"] = forecast_seasonal(year)
+        return forecasts
+
+    def _compute(self, department, time_range, version, forecasts):
+        history = get_waste_totals(get_session(), 'day', department, get_time_window_start(time_range))
+        if history.empty:
+            return DashboardState(department, time_range, version, history, None, [], {})
+
+        aggregates = compute_aggregates(history)
+        return DashboardState(
+            department, time_range, version, history, aggregates,
+            get_waste_insights(history, aggregates=aggregates), forecasts
+        )
+
+    def _publish(self, state):
+        with self._lock:
+            self._states[(state.department, state.time_range)] = state
+
+    def stats(self):
+        with self._lock:
+            states = list(self._states.values())
+        return {
+            'alive': self._thread.is_alive(),
+            'states': len(states),
+            'cycles': self.cycles,
+            'refreshed': self.refreshed,
+            'errors': self.errors,
+            'last_error': self.last_error,
+            'last_cycle_seconds': round(self.last_cycle_seconds, 3),
+            'reconciled_departments': self.reconciled_departments,
+            'partitions_created': self.partitions_created,
+            'external_changes': self.external_changes,
+            'oldest_state': min((state.computed_at for state in states), default=None)
+        }
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def start_refresh_worker():
+    """Start the process-wide refresh worker once; returns it (None when REFRESH_WORKER is off)."""
+    global _worker
+    if os.getenv('REFRESH_WORKER', 'true').strip().lower() not in ('1', 'true', 'yes', 'on'):
+        return None
+    if _worker is None:
+        with _worker_lock:
+            if _worker is None:
+                _worker = RefreshWorker().start()
+    return _worker
+
+def get_refresh_worker():
+    return _worker
+
+def get_dashboard_state(department, time_range):
+    """Precomputed state for the department and range, or None if the page must compute it."""
+    return _worker.get(department, time_range) if _worker is not None else None
@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+from sqlalchemy import event
+
+# Finished traces kept for the admin Performance tab, newest last
+TRACE_HISTORY = int(os.getenv('TRACE_HISTORY', '200'))
+MAX_QUERIES_PER_TRACE = 50
+
+_current = ContextVar('trace', default=None)
+_history = deque(maxlen=TRACE_HISTORY)
+_history_lock = threading.Lock()
+
+class Span:
+    """One timed stage of a trace; self_ms excludes nested spans and SQL."""
+
+    __slots__ = ('name', 'category', 'depth', 'ms', 'self_ms', '_child_ms')
+
+    def __init__(self, name, category, depth):
+        self.name = name
+        self.category = category
+        self.depth = depth
+        self.ms = 0.0
+        self.self_ms = 0.0
+        self._child_ms = 0.0
+
+class Trace:
+    """Timings for one script rerun: spans plus the SQL executed while it was active."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now()
+        self.spans = []
+        self.queries = []
+        self.sql_ms = 0.0
+        self.sql_statements = 0
+        self.sql_rows = 0
+        self.total_ms = None
+        self._started = time.perf_counter()
+        self._stack = []
+
+    def _charge_parent(self, ms):
+        if self._stack:
+            self._stack[-1]._child_ms += ms
+
+    def record_sql(self, statement, ms, rows):
+        self.sql_ms += ms
+        self.sql_statements += 1
+        if rows is not None and rows >= 0:
+            self.sql_rows += rows
+        if len(self.queries) < MAX_QUERIES_PER_TRACE:
+            self.queries.append((' '.join(statement.split())[:200], ms, rows))
+        self._charge_parent(ms)
+
+    def category_ms(self):
+        """Exclusive time per category, with SQL counted once under 'sql'."""
+        totals = {'sql': self.sql_ms}
+        for span in self.spans:
+            totals[span.category] = totals.get(span.category, 0.0) + span.self_ms
+        return totals
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self._started) * 1000
+        return self
+
+@contextmanager
+def span(name, category='app'):
+    """Time the enclosed block as a span of the current trace (a no-op timer without one)."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+
+    current = Span(name, category, len(trace._stack))
+    trace.spans.append(current)
+    trace._stack.append(current)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        current.ms = (time.perf_counter() - started) * 1000
+        current.self_ms = max(current.ms - current._child_ms, 0.0)
+        trace._stack.pop()
+        trace._charge_parent(current.ms)
+
+def start_trace(name):
+    """Begin tracing a rerun on the current thread. Reruns cut short by st.rerun() are not recorded."""
+    trace = Trace(name)
+    _current.set(trace)
+    return trace
+
+def current_trace():
+    return _current.get()
+
+def finish_trace():
+    """Stop the current trace and keep it in the recent history."""
+    trace = _current.get()
+    if trace is None:
+        return None
+    _current.set(None)
+    trace.finish()
+    with _history_lock:
+        _history.append(trace)
+    return trace
+
+def recent_traces(name=None):
+    """Finished traces, oldest first, optionally only those with the given name."""
+    with _history_lock:
+        traces = list(_history)
+    return [trace for trace in traces if name is None or trace.name == name]
+
+def clear_traces():
+    with _history_lock:
+        _history.clear()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault('trace_query_start', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    trace = _current.get()
+    starts = conn.info.get('trace_query_start')
+    if trace is None or not starts:
+        return
+    ms = (time.perf_counter() - starts.pop()) * 1000
+    # rowcount is rows affected for DML; for SELECTs psycopg2 reports rows returned, SQLite -1
+    trace.record_sql(statement, ms, cursor.rowcount)
+
+def _handle_error(context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    starts = context.connection.info.get('trace_query_start') if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+def instrument_engine(engine):
+    """Record the time and row count of every statement run on engine into the active trace."""
+    if not event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(engine, 'handle_error', _handle_error)
+    return engine
@@ -2,6 +2,9 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 import pandas as pd
+from utils.aggregates import DAY_NAMES, compute_aggregates
+from utils.downsample import clip_to_range, downsample_series, points_for_width
+from utils.tracing import span
 
 def create_waste_distribution(current_data):
     """Create waste distribution pie chart with insights."""
@@ -41,8 +44,11 @@ def create_waste_distribution(current_data):
 
     return fig
 
-def create_time_analysis(historical_data, waste_types):
-    """Create monthly and weekly analysis charts."""
+def create_time_analysis(historical_data, waste_types, aggregates=None):
+    """Create monthly and weekly analysis charts.
+
+    aggregates is an optional WasteAggregates bundle for historical_data; it is computed here if omitted.
+    """
     colors = {
         'Paper': 'rgb(139, 69, 19)',
         'Plastic': 'rgb(30, 144, 255)',
@@ -58,8 +64,12 @@ def create_time_analysis(historical_data, waste_types):
         vertical_spacing=0.15
     )
 
+    if aggregates is None:
+        with span("compute_aggregates", "pandas"):
+            aggregates = compute_aggregates(historical_data)
+
     # Monthly trends
-    monthly_data = historical_data.resample('M').mean()
+    monthly_data = aggregates.monthly_means
     for waste_type in waste_types:
         fig.add_trace(
             go.Scatter(
@@ -74,13 +84,12 @@ def create_time_analysis(historical_data, waste_types):
         )
 
     # Weekly patterns
-    weekly_avg = historical_data.groupby(historical_data.index.dayofweek).mean()
-    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    weekly_avg = aggregates.weekday_means
 
     for waste_type in waste_types:
         fig.add_trace(
             go.Bar(
-                x=days,
+                x=[DAY_NAMES[day] for day in weekly_avg.index],
                 y=weekly_avg[waste_type],
                 name=waste_type,
                 marker_color=colors[waste_type],
@@ -110,12 +119,15 @@ def create_time_analysis(historical_data, waste_types):
 
     return fig
 
-def get_waste_insights(historical_data):
+def get_waste_insights(historical_data, aggregates=None):
     """Generate comprehensive insights about waste patterns."""
+    if aggregates is None:
+        with span("compute_aggregates", "pandas"):
+            aggregates = compute_aggregates(historical_data)
     insights = []
 
     # Calculate month-over-month growth
-    monthly_totals = historical_data.resample('M').sum()
+    monthly_totals = aggregates.monthly_totals
     if len(monthly_totals) >= 2:
         current_month = monthly_totals.iloc[-1].sum()
         prev_month = monthly_totals.iloc[-2].sum()
@@ -129,20 +141,19 @@ def get_waste_insights(historical_data):
         })
 
     # Calculate peak collection days
-    daily_avg = historical_data.groupby(historical_data.index.dayofweek).mean()
+    daily_avg = aggregates.weekday_means
     peak_day = daily_avg.sum(axis=1).idxmax()
-    days = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
     insights.append({
         'title': 'Peak Collection Day',
-        'value': days[peak_day],
+        'value': DAY_NAMES[peak_day],
         'description': "Day with highest average collection",
         'trend': '📅',
         'color': 'blue'
     })
 
     # Calculate recycling efficiency
-    total_waste = historical_data.sum().sum()
-    recyclable = total_waste - historical_data['Toxic'].sum()
+    total_waste = aggregates.totals.sum()
+    recyclable = total_waste - aggregates.totals['Toxic']
     recycling_rate = (recyclable / total_waste) * 100
     insights.append({
         'title': 'Recycling Efficiency',
@@ -154,8 +165,18 @@ def get_waste_insights(historical_data):
 
     return insights
 
-def create_prediction_chart(historical_data, predictions, waste_types):
-    """Create an interactive chart showing historical data and predictions."""
+def create_prediction_chart(historical_data, predictions, waste_types, intervals=None, aggregates=None,
+                            max_points=None, x_range=None):
+    """Create an interactive chart showing historical data and predictions.
+
+    intervals is an optional (lower, upper) pair of DataFrames shaped like predictions;
+    aggregates is an optional WasteAggregates bundle for historical_data. Historical
+    traces are downsampled with LTTB to max_points (default: one per pixel of chart
+    width); x_range = (start, end) zooms in and plots that range at full resolution
+    when it fits.
+    """
+    max_points = max_points or points_for_width()
+    history = clip_to_range(historical_data, x_range)
     colors = {
         'Paper': 'rgb(139, 69, 19)',
         'Plastic': 'rgb(30, 144, 255)',
@@ -170,13 +191,20 @@ def create_prediction_chart(historical_data, predictions, waste_types):
         row_heights=[0.7, 0.3]  
     )
 
+    if aggregates is None:
+        with span("compute_aggregates", "pandas"):
+            aggregates = compute_aggregates(historical_data)
+    weekly_avg = aggregates.weekday_means
+
     # Add historical data and predictions
     for waste_type in waste_types:
         # Historical trend
+        with span("downsample history", "pandas"):
+            trend = downsample_series(history[waste_type], max_points)
         fig.add_trace(
             go.Scatter(
-                x=historical_data.index,
-                y=historical_data[waste_type],
+                x=trend.index,
+                y=trend.values,
                 name=f"{waste_type} (Historical)",
                 mode='lines',
                 line=dict(color=colors[waste_type], width=2)
@@ -185,6 +213,22 @@ def create_prediction_chart(historical_data, predictions, waste_types):
         )
 
         # Predictions with confidence band
+        if intervals is not None:
+            lower, upper = intervals
+            fig.add_trace(
+                go.Scatter(
+                    x=list(predictions.index) + list(predictions.index[::-1]),
+                    y=list(upper[waste_type]) + list(lower[waste_type][::-1]),
+                    name=f"{waste_type} (Interval)",
+                    fill='toself',
+                    fillcolor=colors[waste_type].replace('rgb', 'rgba').replace(')', ', 0.15)'),
+                    line=dict(width=0),
+                    hoverinfo='skip',
+                    showlegend=False
+                ),
+                row=1, col=1
+            )
+
         fig.add_trace(
             go.Scatter(
                 x=predictions.index,
@@ -198,11 +242,10 @@ def create_prediction_chart(historical_data, predictions, waste_types):
         )
 
         # Weekly patterns
-        weekly_avg = historical_data[waste_type].groupby(historical_data.index.dayofweek).mean()
         fig.add_trace(
             go.Bar(
-                x=['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
-                y=weekly_avg,
+                x=[DAY_NAMES[day][:3] for day in weekly_avg.index],
+                y=weekly_avg[waste_type],
                 name=waste_type,
                 marker_color=colors[waste_type],
                 showlegend=False
@@ -210,6 +253,9 @@ def create_prediction_chart(historical_data, predictions, waste_types):
             row=2, col=1
         )
 
+    if x_range is not None:
+        fig.update_xaxes(range=[pd.Timestamp(x_range[0]), pd.Timestamp(x_range[1])], row=1, col=1)
+
     fig.update_layout(
         height=800,
         hovermode='x unified',
@@ -228,20 +274,54 @@ def create_prediction_chart(historical_data, predictions, waste_types):
 
     return fig
 
+def create_live_chart(daily_data, waste_types, days=14):
+    """Daily totals of the last `days` days for the live display, today included."""
+    colors = {
+        'Paper': 'rgb(139, 69, 19)',
+        'Plastic': 'rgb(30, 144, 255)',
+        'PET': 'rgb(34, 139, 34)',
+        'Toxic': 'rgb(220, 20, 60)'
+    }
+
+    recent = daily_data.iloc[-days:]
+    fig = go.Figure()
+    for waste_type in waste_types:
+        fig.add_trace(
+            go.Scatter(
+                x=recent.index,
+                y=recent[waste_type],
+                name=waste_type,
+                mode='lines+markers',
+                line=dict(color=colors[waste_type], width=2),
+                hovertemplate="%{y:.1f}kg<extra></extra>"
+            )
+        )
+
+    fig.update_layout(
+        height=300,
+        hovermode='x unified',
+        margin=dict(t=30, b=30),
+        yaxis_title="Amount (kg)",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1)
+    )
+
+    return fig
+
 def create_summary_metrics(historical_data, predictions):
-    """Create summary metrics with trend indicators."""
+    """Create summary metrics with trend indicators.
+
+    The change is None when the latest value is zero, where a percentage means nothing.
+    """
     latest_data = historical_data.iloc[-1]
-    prev_data = historical_data.iloc[-2]
     future_data = predictions.iloc[0]
 
     metrics = []
     for waste_type in latest_data.index:
         current = latest_data[waste_type]
-        previous = prev_data[waste_type]
         predicted = future_data[waste_type]
 
         trend = "↑" if predicted > current else "↓"
-        change_percent = ((predicted - current) / current) * 100
+        change_percent = ((predicted - current) / current) * 100 if current else None
 
         metrics.append({
             'waste_type': waste_type,